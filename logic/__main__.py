@@ -0,0 +1,10 @@
+"""python -m logic runs the command line interface, see cli.py"""
+import os
+import sys
+
+# The modules in this directory import each other by their top-level names
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cli import main
+
+sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Command line interface to the flashcards engine, for scripts, benchmarks and machines
+without a display. It only uses metaManager and never imports PyQt6. From the
+repository root or from logic/:
+
+    python -m logic list
+    python -m logic quiz --count 20 deck.md
+    python cli.py export progress.json
+"""
+from pathlib import Path
+import argparse
+import json
+import random
+import sys
+import time
+from typing import List
+
+from variables import metaManager, default_questions_dir, SCHEDULERS
+from session import studySession
+
+def stars(rank: int) -> str:
+    return "★" * rank + "☆" * (5 - rank)
+
+def check_files(manager: metaManager, filenames: List[str]) -> List[str]:
+    """The given filenames, or every scanned file if there are none"""
+    if not filenames:
+        return sorted(manager.files_by_name)
+    missing = [filename for filename in filenames if manager.get_file(filename) is None]
+    if missing:
+        raise ValueError(f"Not in {manager.questions_dir}: {', '.join(missing)}")
+    return filenames
+
+def cmd_scan(manager: metaManager, args) -> int:
+    # main has scanned already, the manifest keeps unchanged files from being read again
+    files = [manager.get_file(filename) for filename in sorted(manager.files_by_name)]
+    for file_obj in files:
+        print(f"{file_obj.filename}: {file_obj.total_questions} questions")
+    print(f"{len(files)} file(s), {sum(f.total_questions for f in files)} questions in {manager.questions_dir}")
+    return 0
+
+def cmd_list(manager: metaManager, args) -> int:
+    filenames = sorted(manager.files_by_name)
+    decks = manager.get_rank_summary(filenames)["decks"]
+
+    width = max([len(filename) for filename in filenames] + [4])
+    print(f"{'File':<{width}}  {'Hash':<8}  {'Questions':>9}  {'Mastered':>8}")
+    for filename in filenames:
+        file_obj = manager.get_file(filename)
+        deck = decks.get(filename)
+        mastered = f"{deck['mastery'] * 100:.0f}%" if deck else "-"
+        print(f"{filename:<{width}}  {file_obj.hash:<8}  {file_obj.total_questions:>9}  {mastered:>8}")
+    return 0
+
+def cmd_stats(manager: metaManager, args) -> int:
+    filenames = check_files(manager, args.files)
+    summary = manager.get_rank_summary(filenames, args.scheduler)
+    total = summary["total"]
+
+    print(f"Files: {len(filenames)}, questions: {total}")
+    for rank in range(5, 0, -1):
+        print(f"{stars(rank)}  {summary['counts'][rank]:>8}  ({summary['percentages'][rank]:.1f}%)")
+    print(f"Mastered: {summary['mastery'] * 100:.1f}%")
+
+    if args.per_file:
+        print()
+        width = max([len(filename) for filename in summary["decks"]] + [4])
+        print(f"{'File':<{width}}  {'Questions':>9}  " + "  ".join(f"{rank}★".rjust(5) for rank in range(1, 6)) + "  Mastered")
+        for filename, deck in summary["decks"].items():
+            shares = "  ".join(f"{deck['percentages'][rank]:>4.0f}%" for rank in range(1, 6))
+            print(f"{filename:<{width}}  {deck['total']:>9}  {shares}  {deck['mastery'] * 100:>7.0f}%")
+    return 0
+
+def cmd_quiz(manager: metaManager, args) -> int:
+    filenames = check_files(manager, args.files)
+    manager.set_scheduler_mode(args.scheduler)
+    manager.select_files(filenames, lazy = args.lazy)
+
+    session = studySession(manager, seed = args.seed)
+    shuffle_rng = random.Random(session.seed)  # apart from the session's, so replays still match
+    asked = correct_count = 0
+
+    while args.count is None or asked < args.count:
+        question = session.next_question()
+        if question is None:
+            print("No questions available.")
+            break
+
+        answers = question.answers
+        shuffle_rng.shuffle(answers)
+        correct = {i for i, answer in enumerate(answers) if answer['is_correct']}
+
+        old_rank = manager.display_rank(question)
+        print(f"\n[{asked + 1}] {stars(old_rank)}  {manager.available[question.hash].filename} #{question.question_number}")
+        print(question.text)
+        if question.instruction:
+            print(question.instruction)
+        for i, answer in enumerate(answers, 1):
+            print(f"  {i}) {answer['text']}")
+
+        shown_at = time.perf_counter()
+        selected = None
+        while selected is None:
+            try:
+                reply = input("Answer (numbers, q to quit): ").strip()
+            except EOFError:
+                print()
+                reply = "q"
+            if reply.lower() == "q":
+                break
+            try:
+                selected = {int(part) - 1 for part in reply.replace(",", " ").split()}
+            except ValueError:
+                selected = None
+            if selected is not None and (not all(0 <= i < len(answers) for i in selected) or (not selected and correct)):
+                selected = None
+            if selected is None:
+                print(f"Please enter numbers from 1 to {len(answers)}")
+        if selected is None:
+            break
+
+        response_ms = int((time.perf_counter() - shown_at) * 1000)
+        is_correct = selected == correct
+        session.answer(question, is_correct)
+        new_rank = manager.display_rank(question)
+        manager.record_answer(question, is_correct, old_rank, new_rank, response_ms)
+
+        asked += 1
+        if is_correct:
+            correct_count += 1
+            print("✓ Correct!")
+        else:
+            print(f"✗ Incorrect\nCorrect: {', '.join(answers[i]['text'] for i in sorted(correct))}")
+        if new_rank != old_rank:
+            print(f"Rank {old_rank} → {new_rank}")
+        print(f"Reference: {question.source}")
+
+    if asked:
+        print(f"\n{correct_count}/{asked} correct ({correct_count / asked * 100:.0f}%)")
+    return 0
+
+def cmd_reset(manager: metaManager, args) -> int:
+    if not args.files and not args.all:
+        raise ValueError("Name the files to reset, or pass --all")
+    for filename in check_files(manager, args.files):
+        manager.reset_metadata(filename)
+    return 0
+
+def cmd_export(manager: metaManager, args) -> int:
+    data = manager.export_progress(check_files(manager, args.files))
+    if args.output == "-":
+        json.dump(data, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(data, f, indent=2)
+        print(f"Exported {len(data['decks'])} file(s) to {args.output}")
+    return 0
+
+def cmd_import(manager: metaManager, args) -> int:
+    if args.input == "-":
+        data = json.load(sys.stdin)
+    else:
+        with open(args.input, 'r') as f:
+            data = json.load(f)
+    imported = manager.import_progress(data)
+    print(f"Imported {len(imported)} file(s)")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="flashcards", description="Flashcards without the window")
+    parser.add_argument("--questions-dir", help=f"directory with the question files (default {default_questions_dir()})")
+    parser.add_argument("--store", choices=["json", "sqlite"], default="json", help="where progress is kept")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    scan = commands.add_parser("scan", help="scan the question files and count their questions")
+    scan.set_defaults(func=cmd_scan)
+
+    listing = commands.add_parser("list", help="list the question files")
+    listing.set_defaults(func=cmd_list)
+
+    stats = commands.add_parser("stats", help="questions per rank")
+    stats.add_argument("files", nargs="*", help="files to include (default all)")
+    stats.add_argument("--per-file", action="store_true", help="also break the ranks down per file")
+    stats.add_argument("--scheduler", choices=sorted(SCHEDULERS), default="leitner",
+                       help="sm2 counts the stars derived from the spaced repetition schedule")
+    stats.set_defaults(func=cmd_stats)
+
+    quiz = commands.add_parser("quiz", help="answer questions in the terminal")
+    quiz.add_argument("files", nargs="*", help="files to ask from (default all)")
+    quiz.add_argument("--count", type=int, help="stop after this many questions")
+    quiz.add_argument("--scheduler", choices=sorted(SCHEDULERS), default="leitner")
+    quiz.add_argument("--seed", type=int, help="repeat the same session")
+    quiz.add_argument("--lazy", action="store_true", help="load decks lazily")
+    quiz.set_defaults(func=cmd_quiz)
+
+    reset = commands.add_parser("reset", help="put every question of files back at rank 2")
+    reset.add_argument("files", nargs="*")
+    reset.add_argument("--all", action="store_true", help="reset every file")
+    reset.set_defaults(func=cmd_reset)
+
+    export = commands.add_parser("export", help="write rankings and schedules to a JSON file")
+    export.add_argument("output", help="file to write, - for standard output")
+    export.add_argument("files", nargs="*", help="files to export (default all)")
+    export.set_defaults(func=cmd_export)
+
+    importing = commands.add_parser("import", help="replace rankings and schedules with exported ones")
+    importing.add_argument("input", help="file written by export, - for standard input")
+    importing.set_defaults(func=cmd_import)
+
+    return parser
+
+def main(argv = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+
+    # Always passed explicitly, so the manager leaves the working directory alone
+    questions_dir = Path(args.questions_dir).resolve() if args.questions_dir else default_questions_dir()
+    manager = metaManager(str(questions_dir), store = args.store)
+    try:
+        manager.scan_files()
+        return args.func(manager, args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        manager.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Headless deck benchmarks, for the numbers quoted when the deck code changes. Each
+report writes synthetic decks to a temporary directory, e.g.
+
+    python deck_benchmark.py cache --questions 10000 100000
+    python deck_benchmark.py lookup --questions 100000 --lookups 1000
+    python deck_benchmark.py memory --questions 100000 --decks 10
+"""
+from pathlib import Path
+import argparse
+import gc
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from typing import Dict
+
+from variables import metaManager, CACHE_DIR_NAME
+from simulate import write_decks
+
+def open_manager(questions_dir: Path) -> metaManager:
+    """A manager over questions_dir that parses in this process, so timings are not split over workers"""
+    manager = metaManager(str(questions_dir))
+    manager.parse_workers = 1
+    manager.scan_files()
+    return manager
+
+def cache_report(workdir: Path, questions: int) -> Dict:
+    """Parse one deck from its source (writing the compiled cache) and then from the cache"""
+    questions_dir = workdir / f"cache-{questions}"
+    questions_dir.mkdir()
+    filename, = write_decks(questions_dir, 1, questions)
+
+    manager = open_manager(questions_dir)
+    try:
+        file_obj = manager.get_file(filename)
+        start = time.perf_counter()
+        deck = manager._parse_questions(file_obj)
+        cold = time.perf_counter() - start
+
+        del deck
+        gc.collect()
+        start = time.perf_counter()
+        manager._parse_questions(file_obj)
+        warm = time.perf_counter() - start
+
+        return {
+            "questions": questions,
+            "cold": cold,
+            "warm": warm,
+            "cache_mb": manager._get_deck_cache(file_obj.hash).stat().st_size / 1e6,
+            "source_mb": file_obj.filepath.stat().st_size / 1e6,
+        }
+    finally:
+        manager.close()
+
+def run_cache(workdir: Path, args):
+    print(f"{'questions':>9} {'cold parse s':>13} {'warm cache s':>13} {'speedup':>8} {'cache MB':>9} {'source MB':>10}")
+    for questions in args.questions:
+        result = cache_report(workdir, questions)
+        print(
+            f"{result['questions']:>9} {result['cold']:>13.3f} {result['warm']:>13.3f} "
+            f"{result['cold'] / result['warm']:>7.1f}x {result['cache_mb']:>9.1f} {result['source_mb']:>10.1f}"
+        )
+
+def lookup_report(workdir: Path, questions: int, lookups: int, seed: int = 0) -> Dict:
+    """Seconds per get_question_by_id on a loaded deck, and per linear scan over the loaded questions"""
+    questions_dir = workdir / f"lookup-{questions}"
+    questions_dir.mkdir()
+    filename, = write_decks(questions_dir, 1, questions)
+
+    manager = open_manager(questions_dir)
+    try:
+        manager.select_files([filename])
+        file_hash = manager.get_file(filename).hash
+        rng = random.Random(seed)
+        ids = [f"{file_hash}-{rng.randint(1, questions):03d}" for _ in range(lookups)]
+
+        start = time.perf_counter()
+        for question_id in ids:
+            manager.get_question_by_id(question_id)
+        indexed = (time.perf_counter() - start) / lookups
+
+        # What every lookup cost before questions were found by number
+        loaded = manager.get_all_loaded_questions()
+        start = time.perf_counter()
+        for question_id in ids:
+            next(question for question in loaded if question.id == question_id)
+        scan = (time.perf_counter() - start) / lookups
+
+        return {"questions": questions, "lookups": lookups, "indexed": indexed, "scan": scan}
+    finally:
+        manager.close()
+
+def run_lookup(workdir: Path, args):
+    print(f"{'questions':>9} {'lookups':>8} {'by id us':>9} {'linear scan us':>15}")
+    for questions in args.questions:
+        result = lookup_report(workdir, questions, args.lookups)
+        print(
+            f"{result['questions']:>9} {result['lookups']:>8} {result['indexed'] * 1e6:>9.2f} "
+            f"{result['scan'] * 1e6:>15.1f}"
+        )
+
+def memory_report(workdir: Path, questions: int, decks: int) -> Dict:
+    """
+    Bytes per question allocated by select_files (still held afterwards, and at the peak),
+    when parsing the sources and when loading from the compiled cache
+    """
+    questions_dir = workdir / f"memory-{questions}"
+    questions_dir.mkdir()
+    filenames = write_decks(questions_dir, decks, questions)
+
+    manager = open_manager(questions_dir)
+    try:
+        # Create the metadata and the cache first, so only loading is measured
+        manager.select_files(filenames)
+        manager.select_files([])
+
+        result = {"questions": 0}
+        for cached in (False, True):
+            if not cached:
+                shutil.rmtree(questions_dir / CACHE_DIR_NAME, ignore_errors=True)
+            gc.collect()
+            tracemalloc.start()
+            manager.select_files(filenames)
+            gc.collect()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            loaded = sum(len(deck) for deck in manager.loaded.values())
+            name = "cache" if cached else "parse"
+            result["questions"] = loaded
+            result[name] = current / loaded
+            result[f"{name}_peak"] = peak / loaded
+            manager.select_files([])
+        return result
+    finally:
+        manager.close()
+
+def run_memory(workdir: Path, args):
+    print(f"{'questions':>9} {'parse B/q':>10} {'peak':>6} {'cache B/q':>10} {'peak':>6}")
+    for questions in args.questions:
+        result = memory_report(workdir, questions, args.decks)
+        print(
+            f"{result['questions']:>9} {result['parse']:>10.0f} {result['parse_peak']:>6.0f} "
+            f"{result['cache']:>10.0f} {result['cache_peak']:>6.0f}"
+        )
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Deck benchmarks on synthetic decks")
+    reports = parser.add_subparsers(dest="report", metavar="report", required=True)
+
+    cache = reports.add_parser("cache", help="parse time of a deck without and with the compiled cache")
+    cache.add_argument("--questions", type=int, nargs="+", default=[10000, 100000], help="deck sizes")
+    cache.set_defaults(func=run_cache)
+
+    lookup = reports.add_parser("lookup", help="time to find loaded questions by id")
+    lookup.add_argument("--questions", type=int, nargs="+", default=[100000], help="deck sizes")
+    lookup.add_argument("--lookups", type=int, default=1000, help="random ids looked up per deck")
+    lookup.set_defaults(func=run_lookup)
+
+    memory = reports.add_parser("memory", help="memory per loaded question, measured with tracemalloc")
+    memory.add_argument("--questions", type=int, nargs="+", default=[100000], help="questions over all decks")
+    memory.add_argument("--decks", type=int, default=10)
+    memory.set_defaults(func=run_memory)
+
+    args = parser.parse_args(argv)
+    workdir = Path(tempfile.mkdtemp(prefix="flashcards-bench-"))
+    try:
+        args.func(workdir, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+from dataclasses import dataclass
+from array import array
+from pathlib import Path
+import bisect
+import heapq
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional
+
+# Every graded answer is appended to one file per questions directory as a fixed-size
+# record: timestamp, file hash, question number, response time (ms), correct flag,
+# old rank, new rank. Timestamps never decrease, so the file is sorted by time.
+HISTORY_NAME = ".history.bin"
+HISTORY_RECORD = struct.Struct('<d8sIIBBBx')
+HISTORY_TIMESTAMP = struct.Struct('<d')
+
+# Records read per chunk when scanning
+HISTORY_CHUNK = 65536
+
+@dataclass
+class reviewEvent:
+    timestamp: float
+    file_hash: str
+    question_number: int
+    correct: bool
+    old_rank: int
+    new_rank: int
+    response_ms: int
+
+    @property
+    def question_id(self) -> str:
+        return f"{self.file_hash}-{self.question_number:03d}"
+
+class reviewHistory:
+    """
+    Append-only log of review events. Range queries by time use a binary search
+    over the sorted timestamps, queries by deck use a per-deck list of record
+    numbers that is built on the first such query and kept up to date after.
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._file = None
+        self._count = 0
+        self._last_timestamp = 0.0
+        self._deck_index: Optional[Dict[bytes, array]] = None
+
+        if self.path.exists():
+            size = self.path.stat().st_size
+            # Drop a torn record at the end (e.g. crash mid-write) so appends stay aligned
+            if size % HISTORY_RECORD.size:
+                size -= size % HISTORY_RECORD.size
+                os.truncate(self.path, size)
+            self._count = size // HISTORY_RECORD.size
+            if self._count:
+                self._last_timestamp = self._timestamp_at(self._count - 1)
+
+    def __len__(self):
+        return self._count
+
+    def append(self, file_hash: str, question_number: int, correct: bool, old_rank: int,
+               new_rank: int, response_ms: int, timestamp: Optional[float] = None):
+        """Record one graded answer"""
+        if timestamp is None:
+            timestamp = time.time()
+        key = self._key(file_hash)
+
+        with self._lock:
+            # Keep the file sorted even if the clock goes backwards
+            timestamp = max(timestamp, self._last_timestamp)
+            if self._file is None:
+                self._file = open(self.path, 'ab')
+            self._file.write(HISTORY_RECORD.pack(
+                timestamp, key, question_number, max(0, min(response_ms, 0xFFFFFFFF)),
+                bool(correct), old_rank, new_rank
+            ))
+            self._file.flush()
+
+            if self._deck_index is not None:
+                self._deck_index.setdefault(key, array('I')).append(self._count)
+            self._count += 1
+            self._last_timestamp = timestamp
+
+    def events(self, start: Optional[float] = None, end: Optional[float] = None,
+               file_hashes: Optional[Iterable[str]] = None) -> Iterator[reviewEvent]:
+        """
+        Events in time order.
+
+        Args:
+            start: Earliest timestamp to include
+            end: Timestamp to stop before
+            file_hashes: Only events of these decks, all decks if None
+        """
+        with self._lock:
+            count = self._count
+            first = 0 if start is None else self._bisect(start, count)
+            last = count if end is None else self._bisect(end, count)
+            if first >= last:
+                return
+
+            if file_hashes is None:
+                records = self._read_range(first, last)
+            else:
+                index = self._get_deck_index()
+                selected = []
+                for file_hash in set(file_hashes):
+                    numbers = index.get(self._key(file_hash))
+                    if numbers:
+                        lo = bisect.bisect_left(numbers, first)
+                        hi = bisect.bisect_left(numbers, last)
+                        selected.append(numbers[lo:hi])
+                records = self._read_records(heapq.merge(*selected))
+
+        for timestamp, key, question_number, response_ms, correct, old_rank, new_rank in records:
+            yield reviewEvent(
+                timestamp = timestamp,
+                file_hash = key.rstrip(b'\0').decode('ascii'),
+                question_number = question_number,
+                correct = bool(correct),
+                old_rank = old_rank,
+                new_rank = new_rank,
+                response_ms = response_ms
+            )
+
+    @staticmethod
+    def _key(file_hash: str) -> bytes:
+        """File hash as stored in a record, null padded to 8 bytes"""
+        return file_hash.encode('ascii')[:8].ljust(8, b'\0')
+
+    def _timestamp_at(self, record: int) -> float:
+        with open(self.path, 'rb') as f:
+            f.seek(record * HISTORY_RECORD.size)
+            return HISTORY_TIMESTAMP.unpack(f.read(HISTORY_TIMESTAMP.size))[0]
+
+    def _bisect(self, timestamp: float, count: int) -> int:
+        """Number of the first record at or after timestamp"""
+        lo, hi = 0, count
+        with open(self.path, 'rb') as f:
+            while lo < hi:
+                mid = (lo + hi) // 2
+                f.seek(mid * HISTORY_RECORD.size)
+                if HISTORY_TIMESTAMP.unpack(f.read(HISTORY_TIMESTAMP.size))[0] < timestamp:
+                    lo = mid + 1
+                else:
+                    hi = mid
+        return lo
+
+    def _read_range(self, first: int, last: int) -> Iterator[tuple]:
+        """Unpack records first..last-1, reading a chunk at a time"""
+        with open(self.path, 'rb') as f:
+            f.seek(first * HISTORY_RECORD.size)
+            while first < last:
+                n = min(HISTORY_CHUNK, last - first)
+                yield from HISTORY_RECORD.iter_unpack(f.read(n * HISTORY_RECORD.size))
+                first += n
+
+    def _read_records(self, numbers: Iterable[int]) -> Iterator[tuple]:
+        """Unpack the records with the given (ascending) numbers"""
+        with open(self.path, 'rb') as f:
+            for number in numbers:
+                f.seek(number * HISTORY_RECORD.size)
+                yield HISTORY_RECORD.unpack(f.read(HISTORY_RECORD.size))
+
+    def _get_deck_index(self) -> Dict[bytes, array]:
+        """Record numbers per deck, built with one pass over the file"""
+        if self._deck_index is None:
+            index: Dict[bytes, array] = {}
+            number = 0
+            for record in self._read_range(0, self._count):
+                index.setdefault(record[1], array('I')).append(number)
+                number += 1
+            self._deck_index = index
+        return self._deck_index
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
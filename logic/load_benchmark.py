@@ -0,0 +1,85 @@
+"""
+Headless deck loading benchmark. Writes synthetic decks, then parses them with
+select_files and select_files_async for several worker process counts and reports
+the wall time and the speedup over parsing serially, e.g.
+
+    python load_benchmark.py --decks 300 --questions 300000 --workers 1 2 4 8 16
+"""
+from pathlib import Path
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from variables import metaManager, CACHE_DIR_NAME
+from simulate import write_decks
+
+def load_once(questions_dir: Path, filenames: List[str], workers: int, use_async: bool,
+              cached: bool) -> Dict:
+    """Load every deck with a fresh manager, returns the seconds it took"""
+    if not cached:
+        shutil.rmtree(questions_dir / CACHE_DIR_NAME, ignore_errors=True)
+
+    manager = metaManager(str(questions_dir))
+    manager.parse_workers = workers
+    manager.scan_files()
+    try:
+        start = time.perf_counter()
+        first_deck = None
+        if use_async:
+            done = threading.Event()
+
+            def on_deck(job, file_obj, deck):
+                nonlocal first_deck
+                if first_deck is None:
+                    first_deck = time.perf_counter() - start
+
+            manager.select_files_async(filenames, on_deck=on_deck, on_done=lambda job: done.set())
+            done.wait()
+        else:
+            manager.select_files(filenames)
+        return {"seconds": time.perf_counter() - start, "first_deck": first_deck}
+    finally:
+        manager.close()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Compare deck loading times for several worker counts")
+    parser.add_argument("--decks", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=60000, help="questions over all decks")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per setting, the fastest counts")
+    parser.add_argument("--cached", action="store_true", help="keep the compiled deck cache between runs")
+    args = parser.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="flashcards-load-"))
+    try:
+        questions_dir = workdir / "questions"
+        questions_dir.mkdir()
+        filenames = write_decks(questions_dir, args.decks, args.questions)
+        print(f"{args.decks} decks, {args.questions} questions, {os.cpu_count()} CPU(s)"
+              f"{', compiled cache kept' if args.cached else ''}")
+        print(f"{'workers':>7} {'select_files s':>15} {'speedup':>8} {'async s':>8} {'speedup':>8} {'first deck s':>13}")
+
+        workers = sorted(set(args.workers) | {1})
+        baseline = {}
+        for count in workers:
+            row = {}
+            for use_async in (False, True):
+                runs = [load_once(questions_dir, filenames, count, use_async, args.cached)
+                        for _ in range(args.repeat)]
+                row[use_async] = min(runs, key=lambda run: run["seconds"])
+            if count == 1:
+                baseline = row
+            print(
+                f"{count:>7} {row[False]['seconds']:>15.3f} {baseline[False]['seconds'] / row[False]['seconds']:>7.2f}x "
+                f"{row[True]['seconds']:>8.3f} {baseline[True]['seconds'] / row[True]['seconds']:>7.2f}x "
+                f"{row[True]['first_deck'] or 0.0:>13.3f}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
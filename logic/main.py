@@ -1,35 +1,57 @@
-from pathlib import Path
+import time
+STARTED = time.perf_counter()  # before the imports, so --profile-startup can count them
+
+import argparse
 import sys
 import subprocess
-from variables import metaManager
-import stats
-import question
-import tutorial
-from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QScrollArea, QCheckBox, QMessageBox, QStackedWidget, QApplication, QStyle
+from typing import Dict, Iterable, List
+from variables import metaManager, default_questions_dir
+from PyQt6.QtCore import Qt, QObject, QTimer, pyqtSignal, QAbstractTableModel, QModelIndex, QEvent, QSize
+from PyQt6.QtWidgets import (
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox, QMessageBox,
+    QStackedWidget, QApplication, QStyle, QTableView, QHeaderView, QAbstractItemView,
+    QStyledItemDelegate, QStyleOptionButton
+)
 from PyQt6.QtGui import QIcon
 
-QUESTIONS_DIR = Path(__file__).parent / "questions"
-QUESTIONS_DIR.mkdir(exist_ok = True)
+# stats, question and tutorial are imported when their screen first opens
+
+IMPORTED = time.perf_counter()
+
+ICON_PATH = default_questions_dir().parent.parent / "flashicon.ico"
 
-manager = metaManager(str(QUESTIONS_DIR))
+class deckLoadSignals(QObject):
+    """Carries deck loading callbacks from the worker thread to the GUI thread"""
+    progress = pyqtSignal(object, object, int, int)
+    deck_loaded = pyqtSignal(object, object, object)
+    finished = pyqtSignal(object)
 
 class ListWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, manager: metaManager, profile: Dict[str, float] = None):
         super().__init__()
+        self.manager = manager
+        self.profile = profile  # startup timings, only with --profile-startup
         self.setWindowTitle("Flashcards")
         self.setGeometry(300, 300, 1000, 500)
+
+        self.question_screen = None
+        self.load_job = None
+        self.load_signals = deckLoadSignals()
+        self.load_signals.progress.connect(self.on_load_progress)
+        self.load_signals.deck_loaded.connect(self.on_deck_loaded)
+        self.load_signals.finished.connect(self.on_load_finished)
         
         # Create stacked widget to hold multiple screens
         self.stacked_widget = QStackedWidget()
         
         self.menu_screen = self.create_menu_screen()
         self.stacked_widget.addWidget(self.menu_screen)
-        self.refresh_list()
         
         self.setCentralWidget(self.stacked_widget)
-        
-        manager.scan_files()
+
+        # The list is filled once the window has been painted, see eventFilter
+        self.status_label.setText("Looking for question files...")
+        self.installEventFilter(self)
     
     def create_menu_screen(self):
         """Creates the main menu widget"""
@@ -63,29 +85,52 @@ class ListWindow(QMainWindow):
         self.refresh.clicked.connect(self.refresh_list)
         main_layout.addWidget(self.refresh)
 
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-
-        self.scroll_content = QWidget()
-        self.scroll_layout = QVBoxLayout()
-        self.scroll_layout.setSpacing(0)
-        self.scroll_layout.setContentsMargins(0,0,0,0)
-
-        self.row_widgets = []
-
-        self.populate_list()
-
-        self.scroll_layout.addStretch()
-        self.scroll_content.setLayout(self.scroll_layout)
-        scroll_area.setWidget(self.scroll_content)
-        main_layout.addWidget(scroll_area)
+        # Only the rows in view are painted, the buttons are drawn by delegates
+        self.deck_model = deckListModel()
+        self.deck_view = QTableView()
+        self.deck_view.setModel(self.deck_model)
+        self.deck_view.setShowGrid(False)
+        self.deck_view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.deck_view.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.deck_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.deck_view.setMouseTracking(True)
+        self.deck_view.setStyleSheet("QTableView::item { border-bottom: 1px solid #ccc; }")
+
+        # Fixed row heights and column widths, so nothing is measured per row
+        header = self.deck_view.horizontalHeader()
+        header.setVisible(False)
+        header.setSectionResizeMode(deckListModel.NAME_COLUMN, QHeaderView.ResizeMode.Stretch)
+        for column in (deckListModel.STATS_COLUMN, deckListModel.RESET_COLUMN):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.Fixed)
+            header.resizeSection(column, 68)
+        rows = self.deck_view.verticalHeader()
+        rows.setVisible(False)
+        rows.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        rows.setDefaultSectionSize(32)
+
+        self.stats_delegate = buttonDelegate(self.deck_view)
+        self.stats_delegate.clicked.connect(self.call_stats)
+        self.deck_view.setItemDelegateForColumn(deckListModel.STATS_COLUMN, self.stats_delegate)
+        self.reset_delegate = buttonDelegate(self.deck_view)
+        self.reset_delegate.clicked.connect(self.reset_stats)
+        self.deck_view.setItemDelegateForColumn(deckListModel.RESET_COLUMN, self.reset_delegate)
+
+        main_layout.addWidget(self.deck_view)
 
         control_layout = QHBoxLayout()
 
         self.start_btn = QPushButton("Start!")
         self.start_btn.clicked.connect(lambda: self.start())
         control_layout.addWidget(self.start_btn)
+
+        self.sm2_check = QCheckBox("Spaced repetition")
+        self.sm2_check.setToolTip("Ask the question that is due first (SM-2) instead of drawing by rank")
+        control_layout.addWidget(self.sm2_check)
+
+        self.cancel_btn = QPushButton("Cancel loading")
+        self.cancel_btn.clicked.connect(self.cancel_loading)
+        self.cancel_btn.setVisible(False)
+        control_layout.addWidget(self.cancel_btn)
         
         self.add_btn = QPushButton("Open Questions Folder")
         self.add_btn.clicked.connect(self.add_item)
@@ -125,42 +170,110 @@ class ListWindow(QMainWindow):
             QMessageBox.warning(self, "No Questions Selected", "Please select a questions file!")
             return
         else: 
-            manager.select_files(checked)
+            self.cancel_loading()
             
             # Remove old screen if exists
-            if hasattr(self, 'question_screen'):
+            if self.question_screen is not None:
                 self.stacked_widget.removeWidget(self.question_screen)
                 self.question_screen.deleteLater()
+                self.question_screen = None
             
-            # Create fresh screen
-            self.question_screen = question.questionsWindow(manager, return_callback=self.return_to_menu)
+            self.manager.set_scheduler_mode(self.scheduler_mode())
+
+            # Parse the files in the background, the quiz opens once the first one is ready
+            self.start_btn.setEnabled(False)
+            self.cancel_btn.setVisible(True)
+            self.status_label.setText(f"Loading {len(checked)} file(s)...")
+            self.load_job = self.manager.select_files_async(
+                checked,
+                on_deck=self.load_signals.deck_loaded.emit,
+                on_progress=self.load_signals.progress.emit,
+                on_done=self.load_signals.finished.emit
+            )
+
+    def on_load_progress(self, job, file_obj, index, total):
+        if job is self.load_job:
+            self.status_label.setText(f"Loading {file_obj.filename} ({index + 1}/{total})...")
+
+    def on_deck_loaded(self, job, file_obj, deck):
+        if job is not self.load_job or job.cancelled:
+            return
+        self.manager.add_loaded_deck(file_obj, deck)
+
+        # Create fresh screen as soon as there is something to ask
+        if self.question_screen is None and len(self.manager.scheduler):
+            import question
+            self.question_screen = question.questionsWindow(self.manager, return_callback=self.return_to_menu)
             self.stacked_widget.addWidget(self.question_screen)
             self.stacked_widget.setCurrentWidget(self.question_screen)
 
+    def on_load_finished(self, job):
+        if job is not self.load_job:
+            return
+        self.load_job = None
+        self.start_btn.setEnabled(True)
+        self.cancel_btn.setVisible(False)
+
+        if job.cancelled:
+            self.status_label.setText("Loading cancelled")
+        elif self.question_screen is None:
+            self.status_label.setText("Ready")
+            QMessageBox.warning(self, "No Questions", "No questions could be loaded from the selected files.")
+        else:
+            self.status_label.setText(f"Loaded {len(job.files)} file(s)")
+
+    def scheduler_mode(self) -> str:
+        """Scheduler picked in the menu, statistics show the ranks of the same mode"""
+        return "sm2" if self.sm2_check.isChecked() else "leitner"
+
+    def cancel_loading(self):
+        if self.load_job is not None:
+            self.load_job.cancel()
+
     def return_to_menu(self):
+        self.cancel_loading()
         self.stacked_widget.setCurrentWidget(self.menu_screen)
 
-    def populate_list(self):
-        for row in self.row_widgets:
-            self.scroll_layout.removeWidget(row)
-        self.row_widgets.clear()
+    def eventFilter(self, obj, event):
+        # Waits for the first paint, then starts filling the list and removes itself
+        if obj is self and event.type() == QEvent.Type.Paint:
+            self.removeEventFilter(self)
+            if self.profile is not None:
+                self.profile["first paint"] = time.perf_counter()
+            QTimer.singleShot(0, self.load_files)
+        return False
+
+    def load_files(self):
+        """Show the files known from the scan manifest, then scan for changes after they are painted"""
+        self.manager.load_cached_files()
+        self.populate_list()
+        if self.profile is not None:
+            self.profile["list from manifest"] = time.perf_counter()
+        QTimer.singleShot(0, self.finish_loading_files)
+
+    def finish_loading_files(self):
+        self.refresh_list()
+        self.status_label.setText("Ready")
+        if self.profile is not None:
+            self.profile["scan"] = time.perf_counter()
+            print_startup_profile(self.profile)
+            QApplication.quit()
 
-        for item in manager.get_all_files():
-            self.create_row(item.filename)
+    def populate_list(self):
+        self.deck_model.set_files(item.filename for item in self.manager.get_all_files())
 
     def refresh_list(self):
-        manager.scan_files()
-        self.populate_list()
-    
-    def create_row(self, text):
-        row = ListItemRow(text, on_delete=self.reset_stats, on_stat=self.call_stats)
-        index = len(self.row_widgets)
-        self.scroll_layout.insertWidget(index, row)
-        self.row_widgets.append(row)
-        return row
+        result = self.manager.scan_files()
+        self.apply_scan(result)
+
+    def apply_scan(self, result):
+        """Only add and remove the rows of files that appeared or disappeared"""
+        self.deck_model.remove_files(file_obj.filename for file_obj in result.removed)
+        # Files edited while the app was closed come back as changed without having a row yet
+        self.deck_model.add_files(file_obj.filename for file_obj in result.added + result.changed)
     
     def add_item(self):
-        path = manager.questions_dir
+        path = self.manager.questions_dir
         if sys.platform == 'win32':
             subprocess.run(['explorer', str(path)])
         elif sys.platform == 'darwin':
@@ -169,100 +282,222 @@ class ListWindow(QMainWindow):
             subprocess.run(['xdg-open', str(path)])
 
     def check_all(self):
-        for row in self.row_widgets:
-            row.set_checked(True)
+        self.deck_model.set_all_checked(True)
         self.status_label.setText("Checked all")
 
     def uncheck_all(self):
-        for row in self.row_widgets:
-            row.set_checked(False)
+        self.deck_model.set_all_checked(False)
         self.status_label.setText("Unchecked all")
     
     def reset_stats_grouped(self):
         for file in self.get_checked_items():
-            manager.reset_metadata(file)
+            self.manager.reset_metadata(file)
 
     def reset_stats(self, file):
-        manager.reset_metadata(file)
+        self.manager.reset_metadata(file)
 
     def get_checked_items(self):
-        return[row.text for row in self.row_widgets if row.checkbox.isChecked()]
+        return self.deck_model.checked_files()
     
     def call_tutorial(self):
+        import tutorial
         self.tutorial_window = tutorial.tutorialWindow()
         self.tutorial_window.show()
 
     def call_stats_grouped(self):
-        self.stat_window = stats.statWindow(self.get_checked_items(), manager)
+        import stats
+        self.stat_window = stats.statWindow(self.get_checked_items(), self.manager, self.scheduler_mode())
         self.stat_window.show()
 
     def call_stats(self, file):
-        self.stat_window = stats.statWindow([file], manager)
+        import stats
+        self.stat_window = stats.statWindow([file], self.manager, self.scheduler_mode())
         self.stat_window.show()
 
 
-#A combined widget that allows to check items, reset individual progress, and call the stat screen by ID
-class ListItemRow(QWidget):
-    def __init__(self, text: str, on_delete = None, on_stat = None, parent = None):
-        super().__init__(parent)
-        self.text = text
-        layout = QHBoxLayout()
-        layout.setContentsMargins(5,2,5,2)
-
-        self.checkbox = QCheckBox()
-        layout.addWidget(self.checkbox)
+#The deck list: check a file by its name, reset its progress or call its stat screen by ID.
+#Check states are kept here rather than in widgets, so they survive scrolling and rescans
+class deckListModel(QAbstractTableModel):
+    NAME_COLUMN = 0
+    STATS_COLUMN = 1
+    RESET_COLUMN = 2
+    FILENAME_ROLE = Qt.ItemDataRole.UserRole
 
-        layout.addStretch()
-
-        self.label = QLabel(text)
-        self.label.setMinimumWidth(200)
-        layout.addWidget(self.label)
-
-        self.stat_btn = QPushButton("Stats")
-        self.stat_btn.setMaximumWidth(60)
-        if on_stat:
-            self.stat_btn.clicked.connect(lambda: on_stat(self.text))
-        layout.addWidget(self.stat_btn)
-
-        self.dlt_btn = QPushButton()
-        style = QApplication.style()
+    def __init__(self, parent = None):
+        super().__init__(parent)
+        self.filenames: List[str] = []
+        self.checked = set()
+        self.reset_icon = None
+
+    def rowCount(self, parent = QModelIndex()):
+        return 0 if parent.isValid() else len(self.filenames)
+
+    def columnCount(self, parent = QModelIndex()):
+        return 0 if parent.isValid() else 3
+
+    def data(self, index, role = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        filename = self.filenames[index.row()]
+        column = index.column()
+
+        if role == self.FILENAME_ROLE:
+            return filename
+        if column == self.NAME_COLUMN:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return filename
+            if role == Qt.ItemDataRole.CheckStateRole:
+                return Qt.CheckState.Checked if filename in self.checked else Qt.CheckState.Unchecked
+        elif column == self.STATS_COLUMN:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return "Stats"
+        elif column == self.RESET_COLUMN:
+            if role == Qt.ItemDataRole.DecorationRole:
+                if self.reset_icon is None:
+                    style = QApplication.style()
+                    self.reset_icon = style.standardIcon(QStyle.StandardPixmap.SP_BrowserReload) if style else False
+                return self.reset_icon or None
+            if role == Qt.ItemDataRole.ToolTipRole:
+                return "Reset Progress"
+        return None
+
+    def setData(self, index, value, role = Qt.ItemDataRole.EditRole):
+        if not index.isValid() or index.column() != self.NAME_COLUMN or role != Qt.ItemDataRole.CheckStateRole:
+            return False
+        filename = self.filenames[index.row()]
+        if Qt.CheckState(value) == Qt.CheckState.Checked:
+            self.checked.add(filename)
+        else:
+            self.checked.discard(filename)
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def flags(self, index):
+        flags = Qt.ItemFlag.ItemIsEnabled
+        if index.isValid() and index.column() == self.NAME_COLUMN:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def set_files(self, filenames: Iterable[str]):
+        """Replace all rows, keeping the check state of files that are still listed"""
+        self.beginResetModel()
+        self.filenames = list(filenames)
+        self.checked &= set(self.filenames)
+        self.endResetModel()
+
+    def add_files(self, filenames: Iterable[str]):
+        """Append rows for new files"""
+        known = set(self.filenames)
+        new = [filename for filename in dict.fromkeys(filenames) if filename not in known]
+        if not new:
+            return
+        first = len(self.filenames)
+        self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+        self.filenames.extend(new)
+        self.endInsertRows()
+
+    def remove_files(self, filenames: Iterable[str]):
+        """Remove the rows of files that are gone, one run of adjacent rows at a time"""
+        removed = set(filenames)
+        rows = [row for row, filename in enumerate(self.filenames) if filename in removed]
+        # From the bottom up, so the rows above keep their numbers
+        while rows:
+            last = rows.pop()
+            first = last
+            while rows and rows[-1] == first - 1:
+                first = rows.pop()
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.filenames[first:last + 1]
+            self.endRemoveRows()
+        self.checked -= removed
+
+    def set_all_checked(self, checked: bool):
+        self.checked = set(self.filenames) if checked else set()
+        if self.filenames:
+            self.dataChanged.emit(
+                self.index(0, self.NAME_COLUMN),
+                self.index(len(self.filenames) - 1, self.NAME_COLUMN),
+                [Qt.ItemDataRole.CheckStateRole]
+            )
+
+    def checked_files(self) -> List[str]:
+        """Checked filenames in list order"""
+        return [filename for filename in self.filenames if filename in self.checked]
+
+#Draws a push button in its cells and reports clicks with the row's filename,
+#no widget is created per row
+class buttonDelegate(QStyledItemDelegate):
+    clicked = pyqtSignal(str)
+
+    def paint(self, painter, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(4, 2, -4, -2)
+        button.text = index.data(Qt.ItemDataRole.DisplayRole) or ""
+        icon = index.data(Qt.ItemDataRole.DecorationRole)
+        if icon is not None:
+            button.icon = icon
+            button.iconSize = QSize(16, 16)
+        button.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+        if option.state & QStyle.StateFlag.State_MouseOver:
+            button.state |= QStyle.StateFlag.State_MouseOver
+
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
         if style:
-            self.dlt_btn.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_BrowserReload))
-        self.dlt_btn.setToolTip("Reset Progress")
-        self.dlt_btn.setMaximumWidth(60)
-        if on_delete:
-            self.dlt_btn.clicked.connect(lambda: on_delete(self.text))
-        layout.addWidget(self.dlt_btn)
-
-        self.setStyleSheet("ListItemRow { border-bottom: 1px solid #ccc; }")
-        self.setLayout(layout)
-
-    def is_checked(self):
-        return self.checkbox.isChecked()
-    
-    def set_checked(self, checked):
-        self.checkbox.setChecked(checked)
-    
-    def get_item(self):
-        return self.label.text
-    
-    def set_text(self, text):
-        self.text = text
-        self.label.setText(text)
-
-app = QApplication(sys.argv)
-app.setWindowIcon(QIcon('../flashicon.ico'))
-app.setStyleSheet("""
-            QMessageBox{
-                background-color: #fafafa
-            }
-            QMessageBox QLabel{
-                color: #000
-            }
-            QMessageBox QPushButton{
-                color: #000
-            }
-        """)
-window = ListWindow()
-window.show()
-sys.exit(app.exec())
\ No newline at end of file
+            style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event is not None and event.type() == QEvent.Type.MouseButtonRelease:
+            if option.rect.contains(event.position().toPoint()):
+                self.clicked.emit(index.data(deckListModel.FILENAME_ROLE))
+            return True
+        return super().editorEvent(event, model, option, index)
+
+def print_startup_profile(profile: Dict[str, float]):
+    """How long each startup phase took, and the time since this module started loading"""
+    print(f"{'phase':<20} {'ms':>8} {'total ms':>9}")
+    previous = STARTED
+    for phase, at in profile.items():
+        print(f"{phase:<20} {(at - previous) * 1000:>8.1f} {(at - STARTED) * 1000:>9.1f}")
+        previous = at
+
+def main(argv = None) -> int:
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="Flashcards")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print how long each startup phase took, then quit")
+    args, qt_args = parser.parse_known_args(argv)
+    profile = {"imports": IMPORTED} if args.profile_startup else None
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    app.setWindowIcon(QIcon(str(ICON_PATH)))
+    app.setStyleSheet("""
+                QMessageBox{
+                    background-color: #fafafa
+                }
+                QMessageBox QLabel{
+                    color: #000
+                }
+                QMessageBox QPushButton{
+                    color: #000
+                }
+            """)
+    if profile is not None:
+        profile["application"] = time.perf_counter()
+
+    manager = metaManager()
+    app.aboutToQuit.connect(manager.close)
+    if profile is not None:
+        profile["manager"] = time.perf_counter()
+
+    window = ListWindow(manager, profile)
+    window.show()
+    if profile is not None:
+        profile["window"] = time.perf_counter()
+    return app.exec()
+
+# Worker processes that parse decks re-import this module, so only the main process opens windows
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,73 @@
+import os
 import random
 import sys
-from typing import Optional
-from PyQt6.QtCore import Qt, QTimer, QPoint, QPropertyAnimation
+import time
+from typing import Dict, List, Optional
+from PyQt6.QtCore import Qt, QTimer, QPoint, QPropertyAnimation, QEvent
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QCheckBox, QMessageBox, QScrollArea, QFrame, QGraphicsOpacityEffect, QStyle
+    QCheckBox, QMessageBox, QScrollArea, QFrame, QGraphicsOpacityEffect, QStyle,
+    QStackedWidget, QSizePolicy
 )
 from PyQt6.QtGui import QIcon
 from variables import metaQuestion
+from session import studySession
+
+# The next question is picked and its answers built off-screen while the feedback is read,
+# FLASHCARDS_PREFETCH=0 builds it on the click instead. FLASHCARDS_LATENCY=1 prints the
+# time from the "Next Question" click to the first paint of the new answers.
+PREFETCH = os.environ.get("FLASHCARDS_PREFETCH", "1") != "0"
+LATENCY_LOG = os.environ.get("FLASHCARDS_LATENCY", "0") == "1"
+
+# (row, answer text) stylesheets of an answer row, by state
+ROW_STYLES = {
+    "neutral": ("""
+        QWidget {
+            background-color: transparent;
+            border-radius: 10px;
+            padding: 4px;
+        }
+        QWidget:hover {
+            border-color: #2563eb;
+            background-color: #f8faff;
+        }
+    """, """
+        QLabel {
+            font-size: 15px;
+            color: #374151;
+            padding: 4px;
+        }
+    """),
+    "correct": ("""
+        QWidget {
+            background-color: #d1fae5;
+            border: 2px solid #10b981;
+            border-radius: 10px;
+            padding: 4px;
+        }
+    """, """
+        QLabel {
+            font-size: 15px;
+            color: #065f46;
+            font-weight: 600;
+            padding: 4px;
+        }
+    """),
+    "wrong": ("""
+        QWidget {
+            background-color: #fee2e2;
+            border: 2px solid #ef4444;
+            border-radius: 10px;
+            padding: 4px;
+        }
+    """, """
+        QLabel {
+            font-size: 15px;
+            color: #991b1b;
+            padding: 4px;
+        }
+    """),
+}
 
 
 class AnswerContainer(QWidget):
@@ -18,6 +78,7 @@ class AnswerContainer(QWidget):
         self.answer_text: QLabel | None = None
         self.icon_label: QLabel | None = None
         self.index: int = -1
+        self.style_state = ""  # key of ROW_STYLES currently applied
         self._toggle_callback = None
     
     def set_toggle_callback(self, callback):
@@ -29,16 +90,41 @@ class AnswerContainer(QWidget):
         if self._toggle_callback:
             self._toggle_callback(a0)
         super().mousePressEvent(a0)
+
+class answerPage:
+    """
+    One of the two pages answers are shown on, while one is on screen the next question
+    is bound to the other. Its rows are pooled: they grow to the most answers seen and
+    are rebound to every new question instead of being rebuilt.
+    """
+    def __init__(self, widget: QWidget, layout: QVBoxLayout):
+        self.widget = widget
+        self.layout = layout
+        self.rows: List[AnswerContainer] = []
+        self.question: Optional[metaQuestion] = None
+        self.answers: List[Dict] = []
+        self.origin = ""  # "prefetched" or "built" on the click, for the latency log
+
+    @property
+    def active_rows(self) -> List[AnswerContainer]:
+        """Rows bound to an answer of the current question"""
+        return self.rows[:len(self.answers)]
+
 class questionsWindow(QWidget):
     def __init__(self, manager, return_callback=None):
         super().__init__()
         self.manager = manager
+        self.session = studySession(manager)
         self.return_callback = return_callback
         self.current_question: Optional[metaQuestion] = None
         self.selected_answers = []
         self.shuffled_answers  = []
         self.answer_checkboxes = []
         self.max_selections = 1
+        self.prepared: Optional[answerPage] = None
+        self.clicked_at: Optional[float] = None
+        self.latency_origin = ""
+        self.latencies: Dict[str, List[float]] = {}
         #self.radio_group = QButtonGroup(self) 
 
         # Main layout
@@ -118,21 +204,21 @@ class questionsWindow(QWidget):
         main_layout.addLayout(rank_container)
         
         # === ANSWERS AREA ===
-        scroll_area = QScrollArea()
+        self.scroll_area = scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
         scroll_area.setFrameShape(QFrame.Shape.NoFrame)
         scroll_area.setStyleSheet("QScrollArea { border: none; background: #f0f0f0; }")
         
-        self.answers_widget = QWidget()
-        self.answers_widget.setStyleSheet("background: transparent;")
-        self.answers_layout = QVBoxLayout()
-        self.answers_layout.setSpacing(12)
-        self.answers_layout.setContentsMargins(0, 0, 0, 0)
+        self.answer_stack = QStackedWidget()
+        self.pages = [self._create_page(), self._create_page()]
+        for page in self.pages:
+            self.answer_stack.addWidget(page.widget)
+        self.answers_widget = self.pages[0].widget
+        self.answers_layout = self.pages[0].layout
         
         self.answer_widgets = []
         
-        self.answers_widget.setLayout(self.answers_layout)
-        scroll_area.setWidget(self.answers_widget)
+        scroll_area.setWidget(self.answer_stack)
         main_layout.addWidget(scroll_area)
         
         # === FEEDBACK AREA ===
@@ -272,6 +358,9 @@ class questionsWindow(QWidget):
         self.rank_pos_anim = pos_anim
     
     def load_next_question(self):
+        if self.clicked_at is None and self.current_question is not None:
+            self.clicked_at = time.perf_counter()
+
         # Stop any ongoing rank change animations
         if hasattr(self, 'rank_fade_anim') and self.rank_fade_anim:
             self.rank_fade_anim.stop()
@@ -281,13 +370,70 @@ class questionsWindow(QWidget):
         # Hide rank change label immediately
         self.rank_change_label.setVisible(False)
         
-        self.current_question = self.manager.get_weighted_random_question()
-        
-        if not self.current_question:
-            QMessageBox.warning(self, "No Questions", "No questions available. Please select files from the main menu.")
-            self.return_to_menu()
+        page, self.prepared = self.prepared, None
+        if page is not None and self.manager.get_loaded_question(
+            page.question.hash, page.question.question_number
+        ) is None:
+            # Its deck was unloaded while the feedback was shown, the page gets bound again below
+            page = None
+
+        if page is None:
+            question = self.session.next_question()
+            if not question:
+                self.clicked_at = None
+                QMessageBox.warning(self, "No Questions", "No questions available. Please select files from the main menu.")
+                self.return_to_menu()
+                return
+            page = self._prepare_page(question, "built")
+
+        self._show_page(page)
+
+    def prepare_next_question(self):
+        """Pick the next question and bind its answers off-screen, so advancing is just a swap"""
+        if self.prepared is not None or self.next_btn.isHidden():
             return
-        
+        question = self.session.next_question()
+        if question:
+            self.prepared = self._prepare_page(question, "prefetched")
+
+    def _create_page(self) -> answerPage:
+        widget = QWidget()
+        widget.setStyleSheet("background: transparent;")
+        layout = QVBoxLayout()
+        layout.setSpacing(12)
+        layout.setContentsMargins(0, 0, 0, 0)
+        widget.setLayout(layout)
+        return answerPage(widget, layout)
+
+    def _prepare_page(self, question: metaQuestion, origin: str) -> answerPage:
+        """Shuffle the answers of a question and bind them to the page that is not on screen"""
+        answers = question.answers.copy()
+        random.shuffle(answers)
+
+        page = self.pages[1] if self.answer_stack.currentWidget() is self.pages[0].widget else self.pages[0]
+        page.question = question
+        page.answers = answers
+        page.origin = origin
+
+        # Grow the pool to the number of answers, then rebind the rows
+        while len(page.rows) < len(answers):
+            row = self._create_answer_widget()
+            page.layout.addWidget(row)
+            page.rows.append(row)
+        for i, answer in enumerate(answers):
+            self._bind_answer_widget(page.rows[i], i, answer)
+        for row in page.rows[len(answers):]:
+            row.setVisible(False)
+
+        # Resolve new rows' stylesheets and the layout now rather than on the first paint
+        page.widget.ensurePolished()
+        page.layout.activate()
+        return page
+
+    def _show_page(self, page: answerPage):
+        """Show a prepared question, replacing the answers of the previous one"""
+        self.current_question = page.question
+
         # Reset state
         self.selected_answers = []
         self.feedback_container.setVisible(False)
@@ -298,18 +444,8 @@ class questionsWindow(QWidget):
         self.question_label.setText(self.current_question.text)
         
         # Update rank display
-        stars = "★" * self.current_question.rank + "☆" * (5 - self.current_question.rank)
-        self.rank_display.setText(stars)
-        
-        # Clear previous answers
-        for widget in self.answer_widgets:
-            self.answers_layout.removeWidget(widget)
-            widget.deleteLater()
-        self.answer_widgets.clear()
-        self.answer_checkboxes.clear()
-
-        #for button in self.radio_group.buttons():
-        #    self.radio_group.removeButton(button)
+        rank = self.manager.display_rank(self.current_question)
+        self.rank_display.setText("★" * rank + "☆" * (5 - rank))
         
         # Calculate correct answers count and set max selections
         correct_count = sum(1 for answer in self.current_question.answers if answer['is_correct'])
@@ -326,36 +462,53 @@ class questionsWindow(QWidget):
             self.instruction_label.setText("Select one answer")
         """
         
-        self.shuffled_answers = self.current_question.answers.copy()
-        random.shuffle(self.shuffled_answers)
+        self.shuffled_answers = page.answers
+        self.answer_widgets = page.active_rows
+        self.answer_checkboxes = [row.selector for row in self.answer_widgets]
+
+        # Swap the pages. The hidden one is ignored when sizing, so only the shown answers scroll
+        for other in self.pages:
+            policy = QSizePolicy.Policy.Preferred if other is page else QSizePolicy.Policy.Ignored
+            other.widget.setSizePolicy(policy, policy)
+        self.answer_stack.setCurrentWidget(page.widget)
+        self.answers_widget = page.widget
+        self.answers_layout = page.layout
+
+        if LATENCY_LOG and self.clicked_at is not None:
+            self.latency_origin = page.origin
+            page.widget.installEventFilter(self)
+        else:
+            self.clicked_at = None
+
+        # Response time is measured from here to the check
+        self.shown_at = time.perf_counter()
+
+    def eventFilter(self, a0, a1):
+        """Time the first paint of a page shown after a click"""
+        if (a1 is not None and a1.type() == QEvent.Type.Paint
+                and a0 is self.answers_widget and self.clicked_at is not None):
+            a0.removeEventFilter(self)
+            self._log_latency((time.perf_counter() - self.clicked_at) * 1000, self.latency_origin)
+            self.clicked_at = None
+        return super().eventFilter(a0, a1)
 
-        # Create answer options
-        for i, answer in enumerate(self.shuffled_answers):
-            answer_container = self._create_answer_widget(i, answer)
-            self.answers_layout.addWidget(answer_container)
-            self.answer_widgets.append(answer_container)
+    def _log_latency(self, ms: float, origin: str):
+        samples = self.latencies.setdefault(origin, [])
+        samples.append(ms)
+        print(f"click to paint: {ms:.1f} ms ({origin}, average {sum(samples) / len(samples):.1f} ms over {len(samples)})")
     
-    def _create_answer_widget(self, index, answer):
-        """Create a single answer option widget with checkbox/radio button"""
+    def _create_answer_widget(self):
+        """Create an answer row with checkbox/radio button, bound to an answer by _bind_answer_widget"""
         answer_container = AnswerContainer()
-        answer_container.setStyleSheet("""
-            QWidget {
-                background-color: transparent;
-                border-radius: 10px;
-                padding: 4px;
-            }
-            QWidget:hover {
-                border-color: #2563eb;
-                background-color: #f8faff;
-            }
-        """)
         
         answer_layout = QHBoxLayout()
         answer_layout.setContentsMargins(16, 12, 16, 12)
         
         selector = QCheckBox()
-        selector.toggled.connect(lambda checked, idx=index: self.on_checkbox_toggled(idx, checked))
-        self.answer_checkboxes.append(selector)
+        # Connected once, the row's index changes with every question it is bound to
+        selector.toggled.connect(
+            lambda checked, row=answer_container: self.on_checkbox_toggled(row.index, checked)
+        )
 
         # Create appropriate selector based on question type
         """
@@ -393,15 +546,8 @@ class questionsWindow(QWidget):
             }
         """)
         
-        answer_text = QLabel(answer['text'])
+        answer_text = QLabel()
         answer_text.setWordWrap(True)
-        answer_text.setStyleSheet("""
-            QLabel {
-                font-size: 15px;
-                color: #374151;
-                padding: 4px;
-            }
-        """)
 
         # Icon label for tick/cross (hidden initially)
         icon_label = QLabel()
@@ -422,7 +568,7 @@ class questionsWindow(QWidget):
         answer_container.selector = selector
         answer_container.answer_text = answer_text
         answer_container.icon_label = icon_label
-        answer_container.index = index
+        self._set_row_style(answer_container, "neutral")
         
         # Make entire container clickable
         def toggle_selector(event, sel=selector):
@@ -432,6 +578,29 @@ class questionsWindow(QWidget):
         answer_container.set_toggle_callback(toggle_selector)
         
         return answer_container
+
+    def _bind_answer_widget(self, row: AnswerContainer, index: int, answer: Dict):
+        """Show an answer on a pooled row and clear what the previous question left on it"""
+        row.index = index
+        row.answer_text.setText(answer['text'])
+        # Unchecking here is not a selection change
+        row.selector.blockSignals(True)
+        row.selector.setChecked(False)
+        row.selector.blockSignals(False)
+        row.selector.setEnabled(True)
+        row.icon_label.setVisible(False)
+        row.setCursor(Qt.CursorShape.PointingHandCursor)
+        self._set_row_style(row, "neutral")
+        row.setVisible(True)
+
+    def _set_row_style(self, row: AnswerContainer, state: str):
+        """Apply a ROW_STYLES state, skipping the style recomputation if the row already has it"""
+        if row.style_state == state:
+            return
+        row_style, text_style = ROW_STYLES[state]
+        row.setStyleSheet(row_style)
+        row.answer_text.setStyleSheet(text_style)
+        row.style_state = state
     
     """
     def on_radio_selected(self, index, checked):
@@ -473,17 +642,7 @@ class questionsWindow(QWidget):
                 for i, checkbox in enumerate(self.answer_checkboxes):
                     checkbox.setEnabled(True)
                     # Reset container styling
-                    self.answer_widgets[i].setStyleSheet("""
-                        QWidget {
-                            background-color: transparent;
-                            border-radius: 10px;
-                            padding: 4px;
-                        }
-                        QWidget:hover {
-                            border-color: #2563eb;
-                            background-color: #f8faff;
-                        }
-                    """)
+                    self._set_row_style(self.answer_widgets[i], "neutral")
     
     def check_answer(self):
         """Check if the selected answer(s) are correct"""
@@ -502,7 +661,8 @@ class questionsWindow(QWidget):
             return
         
         is_correct = set(self.selected_answers) == set(correct_indices)
-        old_rank = self.current_question.rank
+        old_rank = self.manager.display_rank(self.current_question)
+        response_ms = int((time.perf_counter() - self.shown_at) * 1000)
         
         # Get Qt standard icons
         style = self.style()
@@ -515,22 +675,7 @@ class questionsWindow(QWidget):
         for i, container in enumerate(self.answer_widgets):
             if i in correct_indices and i in self.selected_answers:
                 # Correct answer selected - show in green with tick
-                container.setStyleSheet("""
-                    QWidget {
-                        background-color: #d1fae5;
-                        border: 2px solid #10b981;
-                        border-radius: 10px;
-                        padding: 4px;
-                    }
-                """)
-                container.answer_text.setStyleSheet("""
-                    QLabel {
-                        font-size: 15px;
-                        color: #065f46;
-                        font-weight: 600;
-                        padding: 4px;
-                    }
-                """)
+                self._set_row_style(container, "correct")
                 # Show tick icon
                 if container.icon_label:
                     container.icon_label.setPixmap(tick_icon.pixmap(24, 24))
@@ -538,21 +683,7 @@ class questionsWindow(QWidget):
                 
             elif i in self.selected_answers:
                 # Wrong selection - show in red with cross
-                container.setStyleSheet("""
-                    QWidget {
-                        background-color: #fee2e2;
-                        border: 2px solid #ef4444;
-                        border-radius: 10px;
-                        padding: 4px;
-                    }
-                """)
-                container.answer_text.setStyleSheet("""
-                    QLabel {
-                        font-size: 15px;
-                        color: #991b1b;
-                        padding: 4px;
-                    }
-                """)
+                self._set_row_style(container, "wrong")
                 # Show cross icon
                 if container.icon_label:
                     container.icon_label.setPixmap(cross_icon.pixmap(24, 24))
@@ -593,11 +724,7 @@ class questionsWindow(QWidget):
                 }
             """)
             
-            self.manager.quick_rank_up(self.current_question)
-            if self.current_question.rank != old_rank:
-                self.show_notification(
-                    f"Rank Up!\n{old_rank} → {self.current_question.rank}"
-                )
+            self.session.answer(self.current_question, True)
         else:
             correct_answers = [
                 self.current_question.answers[i]['text'] 
@@ -621,23 +748,34 @@ class questionsWindow(QWidget):
                 }
             """)
             
-            self.manager.quick_rank_down(self.current_question)
-            if self.current_question.rank != old_rank:
-                self.show_notification(
-                    f"Rank Down\n{old_rank} → {self.current_question.rank}"
-                )
+            self.session.answer(self.current_question, False)
+        
+        # The stars can move either way in SM-2 mode, e.g. a correct answer on a long interval
+        new_rank = self.manager.display_rank(self.current_question)
+        if new_rank > old_rank:
+            self.show_notification(f"Rank Up!\n{old_rank} → {new_rank}")
+        elif new_rank < old_rank:
+            self.show_notification(f"Rank Down\n{old_rank} → {new_rank}")
+        
+        self.manager.record_answer(
+            self.current_question, is_correct, old_rank, new_rank, response_ms
+        )
         
         # Show source
         self.source_label.setText(f"Reference: {self.current_question.source}")
         
         # Update rank display only if rank didn't change
-        if self.current_question.rank == old_rank:
-            stars = "★" * self.current_question.rank + "☆" * (5 - self.current_question.rank)
+        if new_rank == old_rank:
+            stars = "★" * new_rank + "☆" * (5 - new_rank)
             self.rank_display.setText(stars)
         
         self.feedback_container.setVisible(True)
         self.check_btn.setVisible(False)
         self.next_btn.setVisible(True)
+
+        # Get the next question ready once the feedback is painted
+        if PREFETCH:
+            QTimer.singleShot(0, self.prepare_next_question)
     
     def return_to_menu(self):
         """Return to the main menu"""
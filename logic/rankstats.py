@@ -0,0 +1,127 @@
+"""
+Rank statistics computed over whole decks at once. Ranks are kept as one byte per
+question (array('B')), so counting them is a single C-level pass over the bytes,
+and combining decks works on a (decks x 5) matrix of histograms. NumPy is used for
+large inputs when it is installed, the standard library otherwise.
+"""
+from array import array
+from typing import Dict, List, Sequence
+
+RANKS = (1, 2, 3, 4, 5)
+
+# Rank of questions whose stored rank is missing or not 1-5, new questions start here too
+DEFAULT_RANK = 2
+
+# Rank arrays from this size on are counted with NumPy. Importing it (about 50 ms)
+# takes longer than the standard library needs for smaller ones, which matters for
+# short command line runs. Summaries only gain 10-20% from it, so they use NumPy
+# only for this many decks and only once something else has imported it.
+NUMPY_MIN_RANKS = 1_000_000
+NUMPY_MIN_DECKS = 5_000
+
+# Every byte value that is a rank, see rank_array
+_RANK_BYTES = bytes(RANKS)
+
+_numpy = None  # the module once imported, False if it is not installed
+
+# Questions at this rank or higher count as mastered
+MASTERED_RANK = 4
+
+def load_numpy():
+    """NumPy, imported on first use, or None if it is not installed"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+def valid_rank(rank) -> int:
+    """rank if it is a rank (1-5), DEFAULT_RANK otherwise"""
+    return rank if isinstance(rank, int) and not isinstance(rank, bool) and 1 <= rank <= 5 else DEFAULT_RANK
+
+def rank_array(ranks) -> array:
+    """Ranks as an array('B') with one entry per given rank, anything that is not a rank (1-5) becomes DEFAULT_RANK"""
+    ranks = ranks if isinstance(ranks, (list, tuple, array)) else list(ranks)
+    try:
+        result = array('B', ranks)
+    except (OverflowError, TypeError):
+        return array('B', [valid_rank(rank) for rank in ranks])
+
+    # Bytes left after deleting every valid rank value are 0 or 6-255
+    if result.tobytes().translate(None, _RANK_BYTES):
+        return array('B', [valid_rank(rank) for rank in result])
+    return result
+
+def count_ranks(ranks) -> List[int]:
+    """Questions per rank of a rank array (or anything with the buffer protocol), [0, rank 1, ..., rank 5]"""
+    numpy = load_numpy() if len(ranks) >= NUMPY_MIN_RANKS else None
+    if numpy is not None:
+        counts = numpy.bincount(numpy.frombuffer(ranks, dtype=numpy.uint8), minlength=6)
+        return [0] + [int(count) for count in counts[1:6]]
+
+    data = bytes(ranks)
+    return [0] + [data.count(rank) for rank in RANKS]
+
+def summarize(histograms: Dict[str, Sequence[int]], mastered_rank: int = MASTERED_RANK) -> Dict:
+    """
+    Combine rank histograms ([0, rank 1, ..., rank 5]) of several decks.
+
+    Args:
+        histograms: Histogram per deck name
+        mastered_rank: Lowest rank that counts as mastered
+
+    Returns:
+        {"counts": {rank: questions}, "total": questions, "percentages": {rank: percent},
+         "mastery": share of mastered questions, "decks": {name: the same four for that deck}}
+    """
+    names = list(histograms)
+    first = mastered_rank - 1
+
+    numpy = (_numpy or None) if len(names) >= NUMPY_MIN_DECKS else None
+    if numpy is not None:
+        matrix = numpy.array([list(histograms[name])[1:6] for name in names], dtype=numpy.int64)
+        totals = matrix.sum(axis=1)
+        safe_totals = numpy.maximum(totals, 1)  # empty decks get 0% everywhere
+        percentages = matrix * 100.0 / safe_totals[:, None]
+        mastery = matrix[:, first:].sum(axis=1) / safe_totals
+
+        combined = matrix.sum(axis=0)
+        total = int(combined.sum())
+        decks = {
+            name: _summary(matrix[i].tolist(), int(totals[i]), percentages[i].tolist(), float(mastery[i]))
+            for i, name in enumerate(names)
+        }
+    else:
+        combined = [0] * 5
+        decks = {}
+        for name in names:
+            counts = list(histograms[name])[1:6]
+            for i, count in enumerate(counts):
+                combined[i] += count
+            deck_total = sum(counts)
+            decks[name] = _summary(
+                counts, deck_total,
+                [count * 100.0 / deck_total if deck_total else 0.0 for count in counts],
+                sum(counts[first:]) / deck_total if deck_total else 0.0
+            )
+        total = sum(combined)
+
+    combined = [int(count) for count in combined]
+    summary = _summary(
+        combined, total,
+        [count * 100.0 / total if total else 0.0 for count in combined],
+        sum(combined[first:]) / total if total else 0.0
+    )
+    summary["decks"] = decks
+    return summary
+
+def _summary(counts: List[int], total: int, percentages: List[float], mastery: float) -> Dict:
+    return {
+        "counts": dict(zip(RANKS, counts)),
+        "total": total,
+        "percentages": dict(zip(RANKS, percentages)),
+        "mastery": mastery,
+    }
@@ -0,0 +1,213 @@
+from array import array
+from collections import deque
+import random
+from typing import Deque, Dict, List, Optional, Tuple
+
+from variables import metaManager, metaQuestion, leitnerScheduler, scheduler
+from rankstats import rank_array
+
+# Questions drawn ahead at a time, and how many recent questions may not come up again
+SESSION_BATCH = 8
+SESSION_NO_REPEAT = 5
+
+class replayScheduler(leitnerScheduler):
+    """
+    Leitner scheduler over the ranks a saved session started from. Answers only
+    change its own copy of the ranks, nothing is written to the metadata.
+    """
+    def __init__(self, manager: metaManager, ranks: Dict[str, array]):
+        super().__init__(manager)
+        self.ranks = ranks
+        self.rebuild()
+
+    def rebuild(self):
+        self.sampler.build(self.ranks)
+
+    def add_deck(self, file_hash: str, deck):
+        pass
+
+    def on_correct(self, question: metaQuestion):
+        self._move(question, 1)
+
+    def on_incorrect(self, question: metaQuestion):
+        self._move(question, -1)
+
+    def _move(self, question: metaQuestion, change: int):
+        # Same steps as metaManager.quick_rank_up and quick_rank_down
+        ranks = self.ranks[question.hash]
+        rank = min(5, max(1, ranks[question.question_number - 1] + change))
+        ranks[question.question_number - 1] = rank
+        self.sampler.update(question.hash, question.question_number, rank)
+
+class studySession:
+    """
+    A run of questions drawn ahead in batches from the manager's scheduler.
+    The last no_repeat questions are never asked again, all random choices
+    come from one seeded generator, and the whole state can be saved with
+    to_dict and restored with from_dict (or replayed from the start with replay).
+    """
+    def __init__(self, manager: metaManager, seed: Optional[int] = None,
+                 batch_size: int = SESSION_BATCH, no_repeat: int = SESSION_NO_REPEAT,
+                 strategy: Optional[scheduler] = None):
+        self.manager = manager
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.batch_size = batch_size
+        self.no_repeat = no_repeat
+        # Replays draw from their own scheduler, sessions normally from the manager's
+        self.strategy = strategy
+
+        self.queue: Deque[Tuple[str, int]] = deque()
+        self.recent: Deque[Tuple[str, int]] = deque(maxlen=no_repeat)
+        self.answers: List[Tuple[str, int, bool]] = []  # (file hash, question number, correct) in order
+        # Ranks of every deck as they were when the session first drew from it, for replay
+        self.start_ranks: Dict[str, array] = {}
+
+    @property
+    def scheduler(self) -> scheduler:
+        return self.strategy if self.strategy is not None else self.manager.scheduler
+
+    def next_question(self) -> Optional[metaQuestion]:
+        """Take the next question from the queue, drawing another batch when it runs empty"""
+        while True:
+            if not self.queue:
+                self._refill()
+                if not self.queue:
+                    return None
+
+            key = self.queue.popleft()
+            question = self.manager.get_loaded_question(*key)
+            if question is None:
+                continue  # its deck was unloaded after it was queued
+
+            self.recent.append(key)
+            return question
+
+    def answer(self, question: metaQuestion, correct: bool):
+        """Pass an answer on to the scheduler, and drop queued draws it may have made outdated"""
+        if self.strategy is None:
+            self.manager.answer_question(question, correct)
+        elif correct:
+            self.strategy.on_correct(question)
+        else:
+            self.strategy.on_incorrect(question)
+        self.answers.append((question.hash, question.question_number, bool(correct)))
+        self.forget((question.hash, question.question_number))
+
+    def forget(self, key: Tuple[str, int]):
+        """
+        Drop queued draws of a question, e.g. after an answer changed its weight or due time.
+        Only that question changed, so the rest of the queue stays.
+        """
+        while key in self.queue:
+            self.queue.remove(key)
+
+    def _refill(self):
+        scheduler = self.scheduler
+        if self.strategy is None:
+            # Decks loaded since the last batch have not been answered from yet
+            for file_hash, ranks in self.manager.rank_arrays.items():
+                if file_hash not in self.start_ranks:
+                    self.start_ranks[file_hash] = array('B', ranks)
+
+        # A deck smaller than the window would run out of questions
+        window = min(self.no_repeat, len(scheduler) - 1)
+        exclude = set(list(self.recent)[max(0, len(self.recent) - window):]) if window > 0 else set()
+        exclude.update(self.queue)
+
+        batch = scheduler.pick_batch(self.batch_size, exclude, self.rng)
+        if not batch and len(scheduler):
+            # Everything left to draw was asked just now, allow a repeat rather than stalling
+            batch = scheduler.pick_batch(1, set(), self.rng)
+        self.queue.extend(batch)
+
+    def to_dict(self) -> Dict:
+        """Everything needed to continue (from_dict) or repeat (replay) this session"""
+        version, internal, gauss = self.rng.getstate()
+        return {
+            "seed": self.seed,
+            "batch_size": self.batch_size,
+            "no_repeat": self.no_repeat,
+            "scheduler": self.scheduler.get_state(),
+            "rng": [version, list(internal), gauss],
+            "queue": [list(key) for key in self.queue],
+            "recent": [list(key) for key in self.recent],
+            "answers": [list(answer) for answer in self.answers],
+            # One digit (1-5) per question
+            "start_ranks": {
+                file_hash: "".join(map(str, ranks)) for file_hash, ranks in self.start_ranks.items()
+            },
+        }
+
+    @staticmethod
+    def _load_ranks(data: Dict) -> Dict[str, array]:
+        return {
+            file_hash: rank_array(int(digit) for digit in digits)
+            for file_hash, digits in data.get("start_ranks", {}).items()
+        }
+
+    @classmethod
+    def _create(cls, manager: metaManager, data: Dict) -> "studySession":
+        """A new session with the settings (and scheduler) of saved data"""
+        state = data.get("scheduler", {})
+        if state.get("name") and state["name"] != manager.scheduler.name:
+            manager.set_scheduler_mode(state["name"])
+        manager.scheduler.set_state(state)
+
+        return cls(
+            manager,
+            seed = data["seed"],
+            batch_size = data.get("batch_size", SESSION_BATCH),
+            no_repeat = data.get("no_repeat", SESSION_NO_REPEAT)
+        )
+
+    @classmethod
+    def from_dict(cls, manager: metaManager, data: Dict) -> "studySession":
+        """Continue a saved session where it stopped"""
+        session = cls._create(manager, data)
+        version, internal, gauss = data["rng"]
+        session.rng.setstate((version, tuple(internal), gauss))
+        session.queue.extend(tuple(key) for key in data.get("queue", []))
+        session.recent.extend(tuple(key) for key in data.get("recent", []))
+        session.answers = [tuple(answer) for answer in data.get("answers", [])]
+        session.start_ranks = cls._load_ranks(data)
+        return session
+
+    @classmethod
+    def replay(cls, manager: metaManager, data: Dict) -> "studySession":
+        """
+        Run a saved session again from its start, giving the recorded answers.
+        Questions are drawn from the ranks saved when the session started, and the
+        answers only change those in memory, so the decks' current ranks do not
+        matter and nothing is written. The decks must be loaded, and the draws only
+        match if they all were before the session's first question.
+
+        Raises:
+            ValueError: if the session cannot be replayed (not a Leitner session, or
+                saved without its starting ranks), or a different question comes up than was recorded
+        """
+        name = data.get("scheduler", {}).get("name", leitnerScheduler.name)
+        if name != leitnerScheduler.name:
+            raise ValueError(f"Only {leitnerScheduler.name} sessions can be replayed, not {name}")
+        if "start_ranks" not in data:
+            raise ValueError("The saved session has no starting ranks to replay from")
+
+        start_ranks = cls._load_ranks(data)
+        strategy = replayScheduler(manager, {file_hash: array('B', ranks) for file_hash, ranks in start_ranks.items()})
+        session = cls(
+            manager,
+            seed = data["seed"],
+            batch_size = data.get("batch_size", SESSION_BATCH),
+            no_repeat = data.get("no_repeat", SESSION_NO_REPEAT),
+            strategy = strategy
+        )
+        session.start_ranks = start_ranks
+        for step, (file_hash, question_number, correct) in enumerate(data.get("answers", [])):
+            question = session.next_question()
+            if question is None or (question.hash, question.question_number) != (file_hash, question_number):
+                got = f"{question.hash}-{question.question_number:03d}" if question else "nothing"
+                raise ValueError(
+                    f"Replay diverged at answer {step + 1}: expected {file_hash}-{question_number:03d}, got {got}"
+                )
+            session.answer(question, correct)
+        return session
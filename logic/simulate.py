@@ -0,0 +1,215 @@
+"""
+Headless scheduler benchmark. Runs scheduler strategies against synthetic learners
+over large synthetic decks and reports draw speed, memory use and retention, e.g.
+
+    python simulate.py --questions 20000 --days 30 --reviews 300
+"""
+from array import array
+from pathlib import Path
+import argparse
+import math
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+from variables import metaManager, SCHEDULERS
+
+# Simulated seconds between two answers, and when a simulated day starts
+SECONDS_PER_ANSWER = 20
+DAY = 86400
+
+class fakeClock:
+    """Clock the simulation moves forward by hand, handed to schedulers that look at time"""
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+class syntheticLearner:
+    """
+    Exponential forgetting model: a question seen before is recalled with probability
+    exp(-elapsed / stability). Every review grows the stability of a recalled question
+    (less so for difficult ones) and shrinks it after a miss. Unseen or forgotten
+    questions can still be guessed.
+    """
+    def __init__(self, sizes: Dict[str, int], rng: random.Random, guess: float = 0.25):
+        self.rng = rng
+        self.guess = guess
+        self.offsets: Dict[str, int] = {}
+        total = 0
+        for file_hash, size in sizes.items():
+            self.offsets[file_hash] = total
+            total += size
+
+        self.difficulty = array('d', (rng.uniform(0.5, 2.0) for _ in range(total)))
+        self.stability = array('d', [0.0]) * total  # days, 0 = never seen
+        self.last_seen = array('d', [0.0]) * total
+
+    def recall(self, index: int, now: float) -> float:
+        stability = self.stability[index]
+        if stability == 0.0:
+            return 0.0
+        return math.exp(-(now - self.last_seen[index]) / DAY / stability)
+
+    def answer(self, file_hash: str, question_number: int, now: float) -> bool:
+        """Answer a question, and learn from the feedback"""
+        index = self.offsets[file_hash] + question_number - 1
+        correct = self.rng.random() < max(self.guess, self.recall(index, now))
+
+        stability = self.stability[index]
+        difficulty = self.difficulty[index]
+        if stability == 0.0:
+            stability = 1.0 / difficulty
+        elif correct:
+            stability *= 1 + 3.0 / difficulty
+        else:
+            stability = max(0.1, stability * 0.5)
+
+        self.stability[index] = stability
+        self.last_seen[index] = now
+        return correct
+
+    def retention(self, now: float) -> float:
+        """Average recall probability over all questions"""
+        total = len(self.stability)
+        return sum(self.recall(index, now) for index in range(total)) / total if total else 0.0
+
+def write_decks(directory: Path, decks: int, questions: int) -> List[str]:
+    """Write synthetic markdown decks with questions split evenly, returns their filenames"""
+    filenames = []
+    per_deck = max(1, questions // decks)
+    for deck in range(decks):
+        filename = f"synthetic-{deck:03d}.md"
+        with open(directory / filename, 'w', encoding='utf-8') as f:
+            f.write(f"# Synthetic deck {deck}\n\n")
+            for number in range(1, per_deck + 1):
+                f.write(
+                    "| ------- |\n"
+                    f"Synthetic question {deck}-{number}?\n"
+                    "| | Please choose the correct answer.\n"
+                    "| ------- |\n"
+                    f"| | Right {number} | True |\n"
+                    f"| | Wrong {number} | False |\n"
+                    "Source:simulation\n\n"
+                )
+        filenames.append(filename)
+    return filenames
+
+def simulate(name: str, questions: int, decks: int, days: int, reviews: int,
+             seed: int = 0, lazy: bool = False) -> Dict:
+    """Run one scheduler over fresh synthetic decks, returns the measurements"""
+    workdir = Path(tempfile.mkdtemp(prefix="flashcards-sim-"))
+    try:
+        questions_dir = workdir / "questions"
+        questions_dir.mkdir()
+        filenames = write_decks(questions_dir, decks, questions)
+
+        manager = metaManager(str(questions_dir))
+        manager.scan_files()
+        manager.select_files(filenames, lazy = lazy)
+
+        clock = fakeClock(time.time())
+        strategy = SCHEDULERS[name](manager)
+        if hasattr(strategy, "rng"):
+            strategy.rng.seed(seed)
+        if hasattr(strategy, "clock"):
+            strategy.clock = clock
+
+        # Memory the strategy needs on top of the loaded decks
+        tracemalloc.start()
+        manager.set_scheduler(strategy)
+        scheduler_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        learner = syntheticLearner({h: len(deck) for h, deck in manager.loaded.items()}, random.Random(seed))
+        draw_time = answer_time = 0.0
+        answered = 0
+        retention = []
+        start = clock.now
+
+        for day in range(days):
+            clock.now = start + day * DAY
+            for _ in range(reviews):
+                t0 = time.perf_counter()
+                question = manager.get_next_question()
+                t1 = time.perf_counter()
+                if question is None:
+                    break
+                correct = learner.answer(question.hash, question.question_number, clock.now)
+                t2 = time.perf_counter()
+                manager.answer_question(question, correct)
+                t3 = time.perf_counter()
+
+                draw_time += t1 - t0
+                answer_time += t3 - t2
+                answered += 1
+                clock.now += SECONDS_PER_ANSWER
+
+            # Measured just before the next day starts
+            retention.append(learner.retention(start + (day + 1) * DAY))
+
+        manager.close()
+        return {
+            "scheduler": name,
+            "questions": sum(len(deck) for deck in manager.loaded.values()),
+            "answered": answered,
+            "draws_per_second": answered / draw_time if draw_time else 0.0,
+            "answers_per_second": answered / answer_time if answer_time else 0.0,
+            "scheduler_kib": scheduler_bytes / 1024,
+            "retention": retention,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def peak_rss_mib() -> float:
+    """Peak resident memory of this process, 0 where the resource module is missing"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def print_report(results: List[Dict]):
+    print(f"{'scheduler':<10} {'questions':>9} {'answered':>9} {'draws/s':>10} {'answers/s':>10} {'sched KiB':>10}")
+    for result in results:
+        print(
+            f"{result['scheduler']:<10} {result['questions']:>9} {result['answered']:>9} "
+            f"{result['draws_per_second']:>10.0f} {result['answers_per_second']:>10.0f} "
+            f"{result['scheduler_kib']:>10.0f}"
+        )
+    print(f"peak RSS {peak_rss_mib():.0f} MiB")
+
+    print("\nretention (average recall probability) at the end of each day")
+    days = len(results[0]['retention']) if results else 0
+    step = max(1, days // 10)
+    shown = sorted(set(range(step - 1, days, step)) | {days - 1}) if days else []
+    print(f"{'day':<10} " + " ".join(f"{day + 1:>6}" for day in shown))
+    for result in results:
+        print(f"{result['scheduler']:<10} " + " ".join(f"{result['retention'][day]:>6.3f}" for day in shown))
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Compare scheduler strategies on synthetic learners")
+    parser.add_argument("--scheduler", choices=sorted(SCHEDULERS) + ["all"], default="all")
+    parser.add_argument("--questions", type=int, default=500, help="questions over all decks")
+    parser.add_argument("--decks", type=int, default=10)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--reviews", type=int, default=200, help="answers per simulated day")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lazy", action="store_true", help="load decks lazily")
+    args = parser.parse_args(argv)
+
+    names = list(SCHEDULERS) if args.scheduler == "all" else [args.scheduler]
+    results = [
+        simulate(name, args.questions, args.decks, args.days, args.reviews, args.seed, args.lazy)
+        for name in names
+    ]
+    print_report(results)
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,13 @@
-import sys
-import json
-from pathlib import Path
 from PyQt6.QtCore import *
 from PyQt6.QtWidgets import *
+from rankstats import summarize
 
 class statWindow(QMainWindow):
-    def __init__(self, filenames, manager):
+    def __init__(self, filenames, manager, mode="leitner"):
         super().__init__()
         self.manager = manager
         self.filenames = filenames
+        self.mode = mode  # "sm2" shows the stars derived from the spaced repetition schedule
         
         self.setWindowTitle("Statistics")
         self.setGeometry(400, 400, 600, 400)
@@ -17,7 +16,7 @@ class statWindow(QMainWindow):
         main_layout = QVBoxLayout()
         
         # Title
-        title = QLabel("Question Statistics")
+        title = QLabel("Spaced Repetition Statistics" if mode == "sm2" else "Question Statistics")
         title.setStyleSheet("QLabel { font-size: 24pt; font-weight: bold; }")
         main_layout.addWidget(title)
         
@@ -28,8 +27,9 @@ class statWindow(QMainWindow):
         main_layout.addWidget(files_label)
         
         # Get stats from metadata
-        rank_counts = self.get_stats_from_metadata()
-        total_questions = sum(rank_counts.values())
+        summary = self.get_stats_from_metadata()
+        rank_counts = summary["counts"]
+        total_questions = summary["total"]
         
         # Total questions display
         total_label = QLabel(f"Total Questions: {total_questions}")
@@ -49,7 +49,7 @@ class statWindow(QMainWindow):
             
             # Count
             count = rank_counts[rank]
-            percentage = (count / total_questions * 100) if total_questions > 0 else 0
+            percentage = summary["percentages"][rank]
             count_label = QLabel(f"{count} questions ({percentage:.1f}%)")
             count_label.setStyleSheet("QLabel { font-size: 12pt; }")
             rank_layout.addWidget(count_label)
@@ -57,7 +57,28 @@ class statWindow(QMainWindow):
             rank_layout.addStretch()
             main_layout.addLayout(rank_layout)
         
-        main_layout.addStretch()
+        # Share of questions at rank 4 or 5
+        mastery_label = QLabel(f"Mastered: {summary['mastery'] * 100:.1f}%")
+        mastery_label.setStyleSheet("QLabel { font-size: 12pt; margin-top: 10px; }")
+        main_layout.addWidget(mastery_label)
+
+        # Per file breakdown when several files are selected
+        decks = summary["decks"]
+        if len(decks) > 1:
+            table = QTableWidget(len(decks), 8)
+            table.setHorizontalHeaderLabels(["File", "Questions", "1★", "2★", "3★", "4★", "5★", "Mastered"])
+            table.verticalHeader().setVisible(False)
+            table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+            for row, (filename, deck) in enumerate(decks.items()):
+                cells = [filename, str(deck["total"])]
+                cells += [f"{deck['percentages'][rank]:.0f}%" for rank in range(1, 6)]
+                cells.append(f"{deck['mastery'] * 100:.0f}%")
+                for column, text in enumerate(cells):
+                    table.setItem(row, column, QTableWidgetItem(text))
+            table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+            main_layout.addWidget(table)
+        else:
+            main_layout.addStretch()
         
         # Close button
         close_btn = QPushButton("Close")
@@ -68,27 +89,10 @@ class statWindow(QMainWindow):
         self.setCentralWidget(main_widget)
     
     def get_stats_from_metadata(self):
-        """Read rank statistics directly from .meta.json files"""
-        rank_counts = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        
-        for filename in self.filenames:
-            # Find the file object in manager's available files
-            for file_obj in self.manager.available.values():
-                if file_obj.filename == filename:
-                    # Get path to metadata file
-                    meta_path = file_obj.filepath.with_suffix('.meta.json')
-                    
-                    if meta_path.exists():
-                        try:
-                            with open(meta_path, 'r') as f:
-                                metadata = json.load(f)
-                            
-                            # Count each rank
-                            for rank in metadata['rankings'].values():
-                                if rank in rank_counts:
-                                    rank_counts[rank] += 1
-                        except Exception as e:
-                            print(f"Error reading metadata for {filename}: {e}")
-                    break
-        
-        return rank_counts
\ No newline at end of file
+        """Rank statistics of the files, combined from the manager's rank histograms (or SM-2 schedules)"""
+        try:
+            # Kept up to date in memory with every rank change, nothing is read from disk in Leitner mode
+            return self.manager.get_rank_summary(self.filenames, self.mode)
+        except Exception as e:
+            print(f"Error reading metadata for {', '.join(self.filenames)}: {e}")
+            return summarize({})
@@ -0,0 +1,403 @@
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+import datetime
+import json
+import sqlite3
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Rank changes are appended to a per-deck journal (<deck>.meta.log) as fixed-size
+# records: timestamp, question number, new rank. The journal is folded back into
+# the .meta.json snapshot on load, on exit, or once it grows past the limit.
+JOURNAL_RECORD = struct.Struct('<dIB')
+JOURNAL_LIMIT = 64 * 1024  # bytes
+
+# One database holds the metadata of every deck in a questions directory
+DATABASE_NAME = ".flashcards.db"
+
+class metaStore:
+    """
+    Where the metadata of each deck is persisted. Decks are addressed by the
+    path of their .meta.json file, whether or not the store uses that file.
+    metaManager keeps its own cache on top, so stores do no caching themselves.
+    """
+
+    def exists(self, meta: Path) -> bool:
+        """Whether metadata was stored for this deck"""
+        raise NotImplementedError
+
+    def has_unsaved_changes(self, meta: Path) -> bool:
+        """Whether changes were kept that the saved snapshot does not contain yet, e.g. after a crash"""
+        return False
+
+    def load(self, meta: Path) -> Tuple[Dict, bool]:
+        """
+        Read the metadata of a deck.
+
+        Returns:
+            The metadata, and whether the stored snapshot is stale and should be saved again
+        """
+        raise NotImplementedError
+
+    def save(self, meta: Path, metadata: Dict, full: bool = True) -> bool:
+        """
+        Persist the metadata of a deck.
+
+        Args:
+            full: False when only the changes passed to record_rank, record_schedule
+                  and record_change need to be written
+
+        Returns:
+            False if nothing was written because the changes are durable already
+            (e.g. in a journal), the deck then needs a full save before exit
+        """
+        raise NotImplementedError
+
+    def record_rank(self, meta: Path, metadata: Dict, question_number: int, rank: int,
+                    timestamp: float) -> bool:
+        """
+        Note a single rank change, metadata already contains it.
+
+        Returns:
+            True if the deck should be saved right away rather than on the next flush
+        """
+        return False
+
+    def record_schedule(self, meta: Path, metadata: Dict, question_number: int, entry: List) -> bool:
+        """
+        Note a changed SM-2 schedule entry, metadata already contains it.
+
+        Returns:
+            True if the deck should be saved right away rather than on the next flush
+        """
+        return False
+
+    def record_change(self, meta: Path):
+        """Note any other change of the metadata, so the next save writes it"""
+        pass
+
+    def delete(self, meta: Path):
+        """Remove everything stored for this deck"""
+        raise NotImplementedError
+
+    def batch(self):
+        """Context manager grouping several saves, e.g. into one transaction"""
+        return nullcontext()
+
+    def close(self):
+        pass
+
+class jsonMetaStore(metaStore):
+    """One .meta.json snapshot per deck, plus an optional rank journal next to it"""
+
+    def __init__(self, journal: bool = True, journal_limit: int = JOURNAL_LIMIT):
+        # Append rank changes to a journal instead of rewriting the .meta.json
+        self.journal = journal
+        self.journal_limit = journal_limit
+        # Decks with changes the journal does not hold, their next save rewrites the snapshot
+        self._unjournaled: set = set()
+
+    def get_journal(self, meta: Path) -> Path:
+        """Get rank journal path from metadata file path"""
+        return meta.with_suffix('.log')
+
+    def exists(self, meta: Path) -> bool:
+        return meta.exists()
+
+    def has_unsaved_changes(self, meta: Path) -> bool:
+        return self.get_journal(meta).exists()
+
+    def load(self, meta: Path) -> Tuple[Dict, bool]:
+        with open(meta, 'r') as f:
+            metadata = json.load(f)
+
+        # Journaled rank changes are applied, the next save folds them into the snapshot
+        journal_path = self.get_journal(meta)
+        replayed = journal_path.exists() and self.replay_journal(metadata, journal_path) > 0
+        if replayed:
+            self._unjournaled.add(meta)
+        return metadata, replayed
+
+    def save(self, meta: Path, metadata: Dict, full: bool = True) -> bool:
+        if not full and self.journal and meta not in self._unjournaled:
+            # Every pending change is in the journal already
+            return False
+
+        with open(meta, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        self.get_journal(meta).unlink(missing_ok=True)
+        self._unjournaled.discard(meta)
+        return True
+
+    def record_rank(self, meta: Path, metadata: Dict, question_number: int, rank: int,
+                    timestamp: float) -> bool:
+        if not self.journal:
+            return False
+
+        # Durable right away, the snapshot itself is written by the next flush
+        with open(self.get_journal(meta), 'ab') as f:
+            f.write(JOURNAL_RECORD.pack(timestamp, question_number, rank))
+            return f.tell() >= self.journal_limit
+
+    def record_schedule(self, meta: Path, metadata: Dict, question_number: int, entry: List) -> bool:
+        # Not journaled, the next flush rewrites the snapshot
+        self._unjournaled.add(meta)
+        return False
+
+    def record_change(self, meta: Path):
+        self._unjournaled.add(meta)
+
+    def delete(self, meta: Path):
+        meta.unlink(missing_ok=True)
+        self.get_journal(meta).unlink(missing_ok=True)
+        self._unjournaled.discard(meta)
+
+    def replay_journal(self, metadata: Dict, journal_path: Path) -> int:
+        """Apply journal records to metadata in place, returns the number applied"""
+        with open(journal_path, 'rb') as f:
+            data = f.read()
+
+        # Ignore a torn record at the end (e.g. crash mid-write)
+        usable = len(data) - len(data) % JOURNAL_RECORD.size
+        count = 0
+        timestamp = None
+        for timestamp, question_number, rank in JOURNAL_RECORD.iter_unpack(data[:usable]):
+            metadata['rankings'][f"{question_number:03d}"] = rank
+            count += 1
+
+        if timestamp is not None:
+            metadata['last_updated'] = datetime.datetime.fromtimestamp(timestamp).isoformat()
+        return count
+
+class sqliteMetaStore(metaStore):
+    """
+    All decks of a questions directory in one SQLite database (WAL mode).
+    Rankings are keyed by (file_hash, question_number), rank changes are
+    buffered and written in one transaction per flush.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS decks (
+            deck TEXT PRIMARY KEY,
+            file_hash TEXT NOT NULL,
+            source_file TEXT NOT NULL,
+            last_updated TEXT NOT NULL,
+            total_questions INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS decks_by_hash ON decks (file_hash);
+        CREATE TABLE IF NOT EXISTS rankings (
+            file_hash TEXT NOT NULL,
+            question_number INTEGER NOT NULL,
+            rank INTEGER NOT NULL,
+            PRIMARY KEY (file_hash, question_number)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS schedule (
+            file_hash TEXT NOT NULL,
+            question_number INTEGER NOT NULL,
+            interval REAL NOT NULL,
+            ease REAL NOT NULL,
+            due REAL NOT NULL,
+            reps INTEGER NOT NULL,
+            PRIMARY KEY (file_hash, question_number)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    # Fixed statements, so sqlite3 prepares each one once and reuses it from its statement cache
+    SELECT_DECK = "SELECT file_hash, source_file, last_updated, total_questions FROM decks WHERE deck = ?"
+    SELECT_RANKS = "SELECT question_number, rank FROM rankings WHERE file_hash = ?"
+    UPSERT_DECK = """
+        INSERT INTO decks (deck, file_hash, source_file, last_updated, total_questions)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (deck) DO UPDATE SET
+            file_hash = excluded.file_hash,
+            source_file = excluded.source_file,
+            last_updated = excluded.last_updated,
+            total_questions = excluded.total_questions
+    """
+    UPSERT_RANK = """
+        INSERT INTO rankings (file_hash, question_number, rank) VALUES (?, ?, ?)
+        ON CONFLICT (file_hash, question_number) DO UPDATE SET rank = excluded.rank
+    """
+    DELETE_RANKS = "DELETE FROM rankings WHERE file_hash = ?"
+    SELECT_SCHEDULE = "SELECT question_number, interval, ease, due, reps FROM schedule WHERE file_hash = ?"
+    UPSERT_SCHEDULE = """
+        INSERT INTO schedule (file_hash, question_number, interval, ease, due, reps) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (file_hash, question_number) DO UPDATE SET
+            interval = excluded.interval, ease = excluded.ease, due = excluded.due, reps = excluded.reps
+    """
+    DELETE_SCHEDULE = "DELETE FROM schedule WHERE file_hash = ?"
+    DELETE_DECK = "DELETE FROM decks WHERE deck = ?"
+
+    def __init__(self, database: Path):
+        self.database = Path(database)
+        # The flush timer writes from its own thread, the lock serializes all use of the connection
+        self.db = sqlite3.connect(self.database, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+
+        # Changes not written yet: file hash -> {question number: rank / schedule entry}
+        self._pending: Dict[str, Dict[int, int]] = {}
+        self._pending_schedule: Dict[str, Dict[int, List]] = {}
+
+    def _commit(self):
+        if self._batch_depth == 0:
+            self.db.commit()
+
+    @contextmanager
+    def batch(self):
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield
+            finally:
+                self._batch_depth -= 1
+                self._commit()
+
+    def exists(self, meta: Path) -> bool:
+        with self._lock:
+            return self.db.execute(self.SELECT_DECK, (meta.name,)).fetchone() is not None
+
+    def load(self, meta: Path) -> Tuple[Dict, bool]:
+        with self._lock:
+            row = self.db.execute(self.SELECT_DECK, (meta.name,)).fetchone()
+            if row is None:
+                raise FileNotFoundError(f"No metadata stored for {meta.name}")
+
+            file_hash, source_file, last_updated, total_questions = row
+            rankings = {
+                f"{question_number:03d}": rank
+                for question_number, rank in self.db.execute(self.SELECT_RANKS, (file_hash,))
+            }
+            schedule = {
+                f"{question_number:03d}": [interval, ease, due, reps]
+                for question_number, interval, ease, due, reps in self.db.execute(self.SELECT_SCHEDULE, (file_hash,))
+            }
+            # Changes still waiting for a flush win over the stored ones
+            for question_number, rank in self._pending.get(file_hash, {}).items():
+                rankings[f"{question_number:03d}"] = rank
+            for question_number, entry in self._pending_schedule.get(file_hash, {}).items():
+                schedule[f"{question_number:03d}"] = list(entry)
+
+        metadata = {
+            "file_hash": file_hash,
+            "source_file": source_file,
+            "last_updated": last_updated,
+            "total_questions": total_questions,
+            "rankings": rankings
+        }
+        if schedule:
+            metadata['schedule'] = schedule
+        return metadata, False
+
+    def save(self, meta: Path, metadata: Dict, full: bool = True) -> bool:
+        file_hash = metadata['file_hash']
+        with self._lock:
+            self.db.execute(self.UPSERT_DECK, (
+                meta.name, file_hash, metadata['source_file'],
+                metadata['last_updated'], metadata['total_questions']
+            ))
+
+            pending = self._pending.pop(file_hash, {})
+            pending_schedule = self._pending_schedule.pop(file_hash, {})
+            if full:
+                self.db.execute(self.DELETE_RANKS, (file_hash,))
+                self.db.executemany(self.UPSERT_RANK, (
+                    (file_hash, int(question_id), rank)
+                    for question_id, rank in metadata['rankings'].items()
+                ))
+                self.db.execute(self.DELETE_SCHEDULE, (file_hash,))
+                self.db.executemany(self.UPSERT_SCHEDULE, (
+                    (file_hash, int(question_id), *entry)
+                    for question_id, entry in metadata.get('schedule', {}).items()
+                ))
+            else:
+                self.db.executemany(self.UPSERT_RANK, (
+                    (file_hash, question_number, rank)
+                    for question_number, rank in pending.items()
+                ))
+                self.db.executemany(self.UPSERT_SCHEDULE, (
+                    (file_hash, question_number, *entry)
+                    for question_number, entry in pending_schedule.items()
+                ))
+            self._commit()
+        return True
+
+    def record_rank(self, meta: Path, metadata: Dict, question_number: int, rank: int,
+                    timestamp: float) -> bool:
+        with self._lock:
+            self._pending.setdefault(metadata['file_hash'], {})[question_number] = rank
+        return False
+
+    def record_schedule(self, meta: Path, metadata: Dict, question_number: int, entry: List) -> bool:
+        with self._lock:
+            self._pending_schedule.setdefault(metadata['file_hash'], {})[question_number] = list(entry)
+        return False
+
+    def delete(self, meta: Path):
+        with self._lock:
+            row = self.db.execute(self.SELECT_DECK, (meta.name,)).fetchone()
+            if row is None:
+                return
+            self._pending.pop(row[0], None)
+            self._pending_schedule.pop(row[0], None)
+            self.db.execute(self.DELETE_RANKS, (row[0],))
+            self.db.execute(self.DELETE_SCHEDULE, (row[0],))
+            self.db.execute(self.DELETE_DECK, (meta.name,))
+            self._commit()
+
+    def get_setting(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self.db.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_setting(self, key: str, value: str):
+        with self._lock:
+            self.db.execute(
+                "INSERT INTO settings (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+            self._commit()
+
+    def close(self):
+        with self._lock:
+            if self.db is not None:
+                self.db.commit()
+                self.db.close()
+                self.db = None
+
+def import_json_metadata(store: sqliteMetaStore, questions_dir: Path) -> int:
+    """
+    One-shot migration of the .meta.json files (and their journals) of a questions
+    directory into a SQLite store. Decks already in the database are left alone and
+    the JSON files are kept as they are. Runs only once per database.
+
+    Returns:
+        The number of decks imported
+    """
+    if store.get_setting("json_imported"):
+        return 0
+
+    source = jsonMetaStore()
+    imported = 0
+    with store.batch():
+        for meta in sorted(Path(questions_dir).glob("*.meta.json")):
+            if store.exists(meta):
+                continue
+            try:
+                metadata, _ = source.load(meta)
+                store.save(meta, metadata)
+                imported += 1
+            except Exception as e:
+                print(f"Could not import {meta.name}: {e}")
+        store.set_setting("json_imported", datetime.datetime.now().isoformat())
+
+    return imported
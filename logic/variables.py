@@ -1,6 +1,12 @@
 from dataclasses import dataclass, field
+from array import array
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, Future, ThreadPoolExecutor, as_completed
+import bisect
 import datetime
 import csv
+import io
+import mmap
 import sys
 import os
 import random
@@ -8,7 +14,16 @@ import re
 import json
 from pathlib import Path
 import hashlib
-from typing import Dict, List, Optional, Tuple
+import heapq
+import marshal
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from storage import DATABASE_NAME, metaStore, jsonMetaStore, sqliteMetaStore, import_json_metadata
+from history import HISTORY_NAME, reviewEvent, reviewHistory
+from rankstats import DEFAULT_RANK, count_ranks, rank_array, summarize, valid_rank
 
 # Rank 1 is the lowest, Rank 5 is the highest
 rank_weights = {
@@ -19,6 +34,47 @@ rank_weights = {
     5: 5
 }
 
+# Seconds without rank changes before dirty metadata is written to disk
+FLUSH_DELAY = 2.0
+
+# Remembers (size, mtime_ns, hash, total_questions) per deck so unchanged files
+# can be skipped when rescanning the questions directory, along with the number
+# of questions per rank (ranks) so statistics need no metadata either
+MANIFEST_NAME = ".scan_manifest.json"
+
+# Separates the question and answer blocks of a markdown question file
+MD_SEPARATOR = re.compile(r'\|\s*-+\s*\|')
+
+# Answer columns of a CSV question file: answer1, answer2, ...
+CSV_ANSWER_COLUMN = re.compile(r'answer(\d+)')
+
+# Parsed decks are cached in questions/.cache/<hash>.qcache so unchanged sources
+# are not parsed again. Bump PARSER_VERSION whenever parsing output changes.
+# Layout: header (magic, parser version, source size, source mtime_ns, payload crc32)
+# followed by the marshalled question rows.
+PARSER_VERSION = 1
+CACHE_DIR_NAME = ".cache"
+CACHE_HEADER = struct.Struct('<4sIQQI')
+CACHE_MAGIC = b'FCQC'
+
+# Questions kept parsed per deck when decks are loaded lazily
+LAZY_CACHE_SIZE = 256
+
+# Parsing fans out over a process pool from this many files on, fewer are parsed serially
+PARALLEL_MIN_FILES = 4
+
+# Format version of metaManager.export_progress data
+PROGRESS_VERSION = 1
+
+# SM-2 settings: starting and lowest ease, answer quality (0-5) given to a correct and
+# a wrong answer, how long until a missed question comes back, and the interval
+# in days a question needs for 2, 3, 4 and 5 stars
+SM2_START_EASE = 2.5
+SM2_MIN_EASE = 1.3
+SM2_QUALITY = {True: 4, False: 2}
+SM2_RELEARN_DELAY = 60.0  # seconds
+SM2_RANK_INTERVALS = (1, 6, 21, 60)
+
 @dataclass
 class metaFile:
     filepath: Path
@@ -29,87 +85,1118 @@ class metaFile:
     is_selected: bool = False
 
 @dataclass
+class scanResult:
+    """Files that appeared, changed, or disappeared since the previous scan"""
+    added: List[metaFile] = field(default_factory=list)
+    changed: List[metaFile] = field(default_factory=list)
+    removed: List[metaFile] = field(default_factory=list)
+
 class metaQuestion:
-    id: str
-    hash: str
-    question_number: int
-    text: str
-    source: str
-    rank: int
-    answers: List[Dict] = field(default_factory=list) 
-    question_type: str = "single_choice"
-    instruction: str = ""  # Store the instruction text
+    """
+    A parsed question, kept small because libraries hold millions of them: fixed slots
+    instead of an instance dict, answers as a tuple of texts plus a bitmask of the correct
+    ones, and interned strings for the values many questions share (source, question type,
+    instruction, answer texts like "True"). The id is derived from hash and question number.
+    Once its deck is loaded the rank lives in the deck's rank array (one byte per question,
+    see metaManager.rank_arrays), so the question, the scheduler and the statistics all
+    read the same value.
+    """
+    __slots__ = (
+        'hash', 'question_number', 'text', 'source', 'question_type', 'instruction', 'line',
+        'answer_texts', 'correct_mask', '_rank', '_ranks'
+    )
+
+    def __init__(self, id: str, hash: str, question_number: int, text: str, source: str,
+                 rank: int, answers: Optional[List[Dict]] = None, question_type: str = "single_choice",
+                 instruction: str = "", line: int = 0):
+        self.hash = sys.intern(hash)
+        self.question_number = question_number
+        self.text = text
+        self.source = sys.intern(source)
+        self.answers = answers if answers is not None else []
+        self.question_type = sys.intern(question_type)
+        self.instruction = sys.intern(instruction)  # Store the instruction text
+        self.line = line  # Line of the question in its source file, for diagnostics
+
+        # Own rank until attach_rank points it into a deck's rank array
+        self._rank = rank
+        self._ranks: Optional[array] = None
+
+    @property
+    def id(self) -> str:
+        return f"{self.hash}-{self.question_number:03d}"
+
+    @property
+    def answers(self) -> List[Dict]:
+        """The answers as a new list of {'text', 'is_correct'} dicts"""
+        mask = self.correct_mask
+        return [
+            {'text': text, 'is_correct': bool(mask >> i & 1)}
+            for i, text in enumerate(self.answer_texts)
+        ]
+
+    @answers.setter
+    def answers(self, answers: List[Dict]):
+        texts = []
+        mask = 0
+        for i, answer in enumerate(answers):
+            texts.append(sys.intern(answer['text']))
+            if answer['is_correct']:
+                mask |= 1 << i
+        self.answer_texts = tuple(texts)
+        self.correct_mask = mask
+
+    @property
+    def rank(self) -> int:
+        if self._ranks is not None:
+            return self._ranks[self.question_number - 1]
+        return self._rank
+
+    @rank.setter
+    def rank(self, value: int):
+        if self._ranks is not None:
+            self._ranks[self.question_number - 1] = value
+        else:
+            self._rank = value
+
+    def attach_rank(self, ranks: array):
+        """Keep the rank in ranks[question_number - 1] from now on"""
+        self._ranks = ranks
+
+    def __getstate__(self):
+        # Worker processes send questions back without a deck array
+        return (self.hash, self.question_number, self.text, self.source, self.question_type,
+                self.instruction, self.line, self.answer_texts, self.correct_mask, self.rank)
+
+    def __setstate__(self, state):
+        (hash, self.question_number, self.text, source, question_type, instruction,
+         self.line, answer_texts, self.correct_mask, self._rank) = state
+        # Unpickled strings are new copies, share them again
+        self.hash = sys.intern(hash)
+        self.source = sys.intern(source)
+        self.question_type = sys.intern(question_type)
+        self.instruction = sys.intern(instruction)
+        self.answer_texts = tuple(sys.intern(text) for text in answer_texts)
+        self._ranks = None
+
+    def _fields(self) -> tuple:
+        return (self.id, self.hash, self.question_number, self.text, self.source, self.rank,
+                self.answers, self.question_type, self.instruction, self.line)
+
+    def __eq__(self, other):
+        if not isinstance(other, metaQuestion):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (f"metaQuestion(id={self.id!r}, hash={self.hash!r}, question_number={self.question_number!r}, "
+                f"text={self.text!r}, source={self.source!r}, rank={self.rank!r}, answers={self.answers!r}, "
+                f"question_type={self.question_type!r}, instruction={self.instruction!r}, line={self.line!r})")
+
+class weightedSampler:
+    """
+    Fenwick (binary indexed) tree over question weights.
+    Draws and weight updates are O(log n), building is O(n).
+    Questions are addressed by (file hash, question number), every deck
+    taking a contiguous block of positions.
+    """
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
+        self.weights = array('I')
+        self.tree = array('q', [0])
+        self.decks: List[str] = []  # deck hashes in position order
+        self.starts: List[int] = []  # first position of each deck
+        self.bases: Dict[str, Tuple[int, int]] = {}  # deck hash -> (first position, size)
+        self.total = 0
+        self._top_bit = 0
+
+    def build(self, decks: Dict[str, Iterable[int]]):
+        """Rebuild the tree from scratch, mapping each file hash to the ranks of its questions in order"""
+        self.weights = array('I')
+        self.tree = array('q', [0])
+        self.decks, self.starts, self.bases = [], [], {}
+        self.total = 0
+        self._top_bit = 0
+        for file_hash, ranks in decks.items():
+            self.add_deck(file_hash, ranks)
+
+    def add_deck(self, file_hash: str, ranks: Iterable[int]):
+        """Append the questions of another deck, in time linear to the size of that deck"""
+        old_n = len(self.weights)
+        self.weights.extend(rank_weights.get(rank, 1) for rank in ranks)
+        n = len(self.weights)
+        self.decks.append(file_hash)
+        self.starts.append(old_n)
+        self.bases[file_hash] = (old_n, n - old_n)
+
+        tree = self.tree
+        tree.extend(self.weights[old_n:].tolist())
+
+        # Old nodes whose parent is one of the new nodes never passed their sum up
+        i = old_n
+        while i:
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+            i -= i & -i
+
+        for i in range(old_n + 1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+
+        self.total += sum(self.weights[old_n:])
+        self._top_bit = 1 << (n.bit_length() - 1) if n else 0
+
+    def update(self, file_hash: str, question_number: int, rank: int):
+        """Refresh the weight of a question after its rank changed"""
+        start, size = self.bases.get(file_hash, (0, 0))
+        if not 1 <= question_number <= size:
+            return
+
+        pos = start + question_number - 1
+        weight = rank_weights.get(rank, 1)
+        delta = weight - self.weights[pos]
+        if delta == 0:
+            return
+
+        self.weights[pos] = weight
+        self.total += delta
+        i = pos + 1
+        n = len(self.weights)
+        while i <= n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def draw(self, rng: Optional[random.Random] = None) -> Optional[Tuple[str, int]]:
+        """Pick a (file hash, question number) with probability proportional to its weight"""
+        if self.total <= 0:
+            return None
+
+        # Find the smallest position whose prefix sum exceeds target
+        target = (rng or self.rng).randrange(self.total)
+        pos = 0
+        bit = self._top_bit
+        n = len(self.weights)
+        while bit:
+            nxt = pos + bit
+            if nxt <= n and self.tree[nxt] <= target:
+                pos = nxt
+                target -= self.tree[nxt]
+            bit >>= 1
+
+        deck = bisect.bisect_right(self.starts, pos) - 1
+        return self.decks[deck], pos - self.starts[deck] + 1
+
+    def __len__(self):
+        return len(self.weights)
+
+class dueQueue:
+    """
+    Loaded questions ordered by due timestamp, in a heap.
+    Rescheduling pushes a new entry in O(log n), the outdated one is
+    skipped when it reaches the top.
+    """
+    def __init__(self):
+        self.heap: List[Tuple[float, str, int]] = []
+        self.due: Dict[Tuple[str, int], float] = {}
+
+    def build(self, entries: Iterable[Tuple[str, int, float]]):
+        """Rebuild from (file hash, question number, due) entries"""
+        self.due = {(file_hash, question_number): due for file_hash, question_number, due in entries}
+        self.heap = [(due, file_hash, question_number) for (file_hash, question_number), due in self.due.items()]
+        heapq.heapify(self.heap)
+
+    def push(self, file_hash: str, question_number: int, due: float):
+        """Add a question or move it to a new due time"""
+        self.due[(file_hash, question_number)] = due
+        heapq.heappush(self.heap, (due, file_hash, question_number))
+
+        # Outdated entries pile up when the same questions keep getting rescheduled
+        if len(self.heap) > 2 * len(self.due) + 64:
+            self.build((h, q, d) for (h, q), d in self.due.items())
+
+    def peek(self) -> Optional[Tuple[str, int]]:
+        """The (file hash, question number) due first, without removing it"""
+        heap = self.heap
+        while heap:
+            due, file_hash, question_number = heap[0]
+            if self.due.get((file_hash, question_number)) == due:
+                return file_hash, question_number
+            heapq.heappop(heap)
+        return None
+
+    def first(self, count: int, exclude: set) -> List[Tuple[str, int]]:
+        """Up to count questions due first, skipping those in exclude"""
+        found, skipped = [], []
+        heap = self.heap
+        while heap and len(found) < count:
+            due, file_hash, question_number = heapq.heappop(heap)
+            key = (file_hash, question_number)
+            if self.due.get(key) != due:
+                continue  # outdated entry
+            skipped.append((due, file_hash, question_number))
+            if key not in exclude:
+                found.append(key)
+
+        # Only looked at, put them back
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return found
+
+    def __len__(self):
+        return len(self.due)
+
+class scheduler:
+    """
+    Strategy deciding which loaded question comes next and what an answer does to it.
+    Questions are addressed by (file hash, question number).
+    """
+    name = ""
+
+    def __init__(self, manager: "metaManager"):
+        self.manager = manager
+
+    def rebuild(self):
+        """Start over from the decks currently loaded in the manager"""
+        raise NotImplementedError
+
+    def add_deck(self, file_hash: str, deck):
+        """Another deck was loaded"""
+        self.rebuild()
+
+    def pick_next(self) -> Optional[Tuple[str, int]]:
+        """The (file hash, question number) to ask next, None if nothing is loaded"""
+        raise NotImplementedError
+
+    def pick_batch(self, count: int, exclude: set, rng: random.Random) -> List[Tuple[str, int]]:
+        """
+        Up to count different questions to ask next, in order, none of them in exclude.
+        Random choices use rng, so a seeded caller gets the same batch again.
+        """
+        key = self.pick_next()
+        return [key] if key is not None and key not in exclude else []
+
+    def on_correct(self, question: metaQuestion):
+        raise NotImplementedError
+
+    def on_incorrect(self, question: metaQuestion):
+        raise NotImplementedError
+
+    def on_rank_changed(self, file_hash: str, question_number: int, rank: int):
+        """Called by metaManager.update_rank for every rank change"""
+        pass
+
+    def display_rank(self, question: metaQuestion) -> int:
+        """1-5 stars shown for a question, its saved rank unless the strategy has its own view"""
+        return question.rank
+
+    def get_state(self) -> Dict:
+        """Settings and internal state as JSON-compatible values"""
+        return {"name": self.name}
+
+    def set_state(self, state: Dict):
+        """Restore what get_state returned"""
+        pass
+
+    def __len__(self):
+        """Number of questions that can be picked"""
+        return 0
+
+class leitnerScheduler(scheduler):
+    """Draws questions at random, weighted by their 1-5 rank (rank_weights)"""
+    name = "leitner"
+
+    def __init__(self, manager: "metaManager", seed: Optional[int] = None):
+        super().__init__(manager)
+        self.rng = random.Random(seed)
+        self.sampler = weightedSampler(self.rng)
+
+    def rebuild(self):
+        self.sampler.build({
+            hash_val: self.manager.rank_arrays[hash_val] for hash_val in self.manager.loaded
+        })
+
+    def add_deck(self, file_hash: str, deck):
+        self.sampler.add_deck(file_hash, self.manager.rank_arrays[file_hash])
+
+    def pick_next(self) -> Optional[Tuple[str, int]]:
+        return self.sampler.draw()
+
+    def pick_batch(self, count: int, exclude: set, rng: random.Random) -> List[Tuple[str, int]]:
+        # Rejection sampling, gives up early when exclude holds most of the weight
+        batch = []
+        taken = set(exclude)
+        for _ in range(count * 8):
+            if len(batch) == count:
+                break
+            key = self.sampler.draw(rng)
+            if key is None:
+                break
+            if key not in taken:
+                batch.append(key)
+                taken.add(key)
+        return batch
+
+    def on_correct(self, question: metaQuestion):
+        self.manager.quick_rank_up(question)
+
+    def on_incorrect(self, question: metaQuestion):
+        self.manager.quick_rank_down(question)
+
+    def on_rank_changed(self, file_hash: str, question_number: int, rank: int):
+        self.sampler.update(file_hash, question_number, rank)
+
+    def get_state(self) -> Dict:
+        version, internal, gauss = self.rng.getstate()
+        return {"name": self.name, "rng": [version, list(internal), gauss]}
+
+    def set_state(self, state: Dict):
+        if state.get("rng"):
+            version, internal, gauss = state["rng"]
+            self.rng.setstate((version, tuple(internal), gauss))
+
+    def __len__(self):
+        return len(self.sampler)
+
+class sm2Scheduler(scheduler):
+    """
+    SM-2 spaced repetition: the question due first comes next. Interval, ease,
+    due timestamp and repetitions of every question are kept in the metadata.
+    The stars shown in this mode are derived from the interval (see display_rank),
+    the saved Leitner ranks are left alone.
+    """
+    name = "sm2"
+
+    def __init__(self, manager: "metaManager", clock = time.time):
+        super().__init__(manager)
+        self.queue = dueQueue()
+        self.clock = clock  # simulations pass a fake clock to skip ahead in time
+        self.start_ease = SM2_START_EASE
+        self.min_ease = SM2_MIN_EASE
+        self.relearn_delay = SM2_RELEARN_DELAY
+
+    def rebuild(self):
+        self.queue.build(
+            entry
+            for hash_val, deck in self.manager.loaded.items()
+            for entry in self._due_entries(hash_val, len(deck))
+        )
+
+    def add_deck(self, file_hash: str, deck):
+        for entry in self._due_entries(file_hash, len(deck)):
+            self.queue.push(*entry)
+
+    def _due_entries(self, file_hash: str, size: int) -> Iterator[Tuple[str, int, float]]:
+        """(file hash, question number, due) of a deck, questions never reviewed are due right away"""
+        schedule = self.manager._get_schedule(file_hash)
+        for question_number in range(1, size + 1):
+            entry = schedule.get(f"{question_number:03d}")
+            yield file_hash, question_number, entry[2] if entry else 0.0
+
+    def pick_next(self) -> Optional[Tuple[str, int]]:
+        return self.queue.peek()
+
+    def pick_batch(self, count: int, exclude: set, rng: random.Random) -> List[Tuple[str, int]]:
+        return self.queue.first(count, exclude)
+
+    def on_correct(self, question: metaQuestion):
+        self.review(question, True)
+
+    def on_incorrect(self, question: metaQuestion):
+        self.review(question, False)
+
+    def review(self, question: metaQuestion, correct: bool):
+        """Reschedule a question, its stars follow from the new interval"""
+        manager = self.manager
+        file_hash = question.hash
+        question_number = question.question_number
+
+        interval, ease, _, reps = manager._get_schedule(file_hash).get(
+            f"{question_number:03d}", (0.0, self.start_ease, 0.0, 0)
+        )
+        interval, ease, reps = self.step(interval, ease, reps, SM2_QUALITY[bool(correct)])
+        ease = max(self.min_ease, ease)
+        due = self.clock() + (interval * 86400 if reps else self.relearn_delay)
+        manager._set_schedule_entry(file_hash, question_number, [interval, ease, due, reps])
+
+        if file_hash in manager.loaded:
+            self.queue.push(file_hash, question_number, due)
+
+    @staticmethod
+    def step(interval: float, ease: float, reps: int, quality: int) -> Tuple[float, float, int]:
+        """One SM-2 review, returns the new interval (days), ease and repetition count"""
+        if quality >= 3:
+            if reps == 0:
+                interval = 1.0
+            elif reps == 1:
+                interval = 6.0
+            else:
+                interval = float(round(interval * ease))
+            reps += 1
+        else:
+            # Start over, the question comes back within the session
+            interval = 0.0
+            reps = 0
+
+        ease += 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        return interval, max(SM2_MIN_EASE, ease), reps
+
+    @staticmethod
+    def rank(interval: float) -> int:
+        """1-5 star rank shown for an SM-2 interval"""
+        return 1 + bisect.bisect_right(SM2_RANK_INTERVALS, interval)
+
+    @staticmethod
+    def histogram(schedule: Dict[str, List], total_questions: int) -> List[int]:
+        """Questions per SM-2 star rank of a deck, [0, rank 1, ..., rank 5], unreviewed ones have 1 star"""
+        histogram = [0] * 6
+        for question_number in range(1, total_questions + 1):
+            entry = schedule.get(f"{question_number:03d}")
+            histogram[sm2Scheduler.rank(entry[0] if entry else 0.0)] += 1
+        return histogram
+
+    def display_rank(self, question: metaQuestion) -> int:
+        entry = self.manager._get_schedule(question.hash).get(f"{question.question_number:03d}")
+        return self.rank(entry[0] if entry else 0.0)
+
+    def get_state(self) -> Dict:
+        return {
+            "name": self.name,
+            "start_ease": self.start_ease,
+            "min_ease": self.min_ease,
+            "relearn_delay": self.relearn_delay
+        }
+
+    def set_state(self, state: Dict):
+        self.start_ease = state.get("start_ease", self.start_ease)
+        self.min_ease = state.get("min_ease", self.min_ease)
+        self.relearn_delay = state.get("relearn_delay", self.relearn_delay)
+
+    def __len__(self):
+        return len(self.queue)
+
+# Scheduler strategies by name, the first one is the default
+SCHEDULERS = {
+    leitnerScheduler.name: leitnerScheduler,
+    sm2Scheduler.name: sm2Scheduler,
+}
+
+class lazyDeck:
+    """
+    The questions of one deck, materialized from a memory-mapped source file on demand.
+    Only a compact record per question (rank, byte offset, length, line) stays resident,
+    plus a small LRU of recently used questions.
+    """
+    def __init__(self, manager: "metaManager", file_obj: metaFile, rankings: Dict[str, int],
+                 cache_size: int = LAZY_CACHE_SIZE):
+        self.manager = manager
+        self.file_obj = file_obj
+        self.offsets = array('Q')
+        self.lengths = array('I')
+        self.lines = array('I')
+        self.ranks = array('B')
+        self.csv_columns = None
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[int, metaQuestion]" = OrderedDict()
+        self._file = None
+        self._map = None
+
+        # One-time index pass over the source
+        file_path = file_obj.filepath
+        if file_path.suffix == '.md':
+            records = manager._index_markdown(file_path)
+        else:
+            records = manager._index_csv(file_path, self)
+
+        for line, start, end in records:
+            self.offsets.append(start)
+            self.lengths.append(end - start)
+            self.lines.append(line)
+            self.ranks.append(valid_rank(rankings.get(f"{len(self.ranks) + 1:03d}", DEFAULT_RANK)))
+
+        if len(self.offsets):
+            self._file = open(file_path, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def __getitem__(self, index: int) -> metaQuestion:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("question index out of range")
+        return self.question(index + 1)
+
+    def __iter__(self):
+        for question_number in range(1, len(self) + 1):
+            yield self.question(question_number)
+
+    def question(self, question_number: int) -> Optional[metaQuestion]:
+        """Get a question by number, parsing it from the source if it is not cached"""
+        if not 1 <= question_number <= len(self):
+            return None
+
+        question = self._cache.get(question_number)
+        if question is not None:
+            self._cache.move_to_end(question_number)
+            return question
+
+        index = question_number - 1
+        start = self.offsets[index]
+        chunk = self._map[start:start + self.lengths[index]]
+        question = self.manager._materialize(self, chunk, start, question_number)
+        question.attach_rank(self.ranks)
+        question.line = self.lines[index]
+
+        self._cache[question_number] = question
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return question
+
+    def set_rank(self, question_number: int, rank: int):
+        """Store a new rank, cached questions read it from ranks"""
+        self.ranks[question_number - 1] = rank
+
+    def close(self):
+        """Release the memory map of the source file"""
+        self._cache.clear()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class loadJob:
+    """Decks being loaded in the background by metaManager.select_files_async"""
+    def __init__(self, files: List[metaFile]):
+        self.files = files
+        self.future: Optional[Future] = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop after the deck that is currently being parsed"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+def default_questions_dir() -> Path:
+    """The questions directory next to the executable when frozen, next to this module otherwise"""
+    if getattr(sys, "frozen", False):
+        directory = Path(sys.executable).parent
+    else: 
+        directory =  Path(__file__).resolve().parent
+    return directory / "questions"
 
 class metaManager:
-    def __init__(self, questions_dir: str = "./questions"):
+    def __init__(self, questions_dir: Optional[str] = None, store: str = "json"):
         
-        if getattr(sys, "frozen", False):
-            directory = Path(sys.executable).parent
-        else: 
-            directory =  Path(__file__).resolve().parent
-
-        os.chdir(directory)          # <-- FORCE working directory to EXE location
+        if questions_dir is None:
+            questions_dir = default_questions_dir()
 
-        self.questions_dir = directory / "questions"
+        self.questions_dir = Path(questions_dir).resolve()
         self.questions_dir.mkdir(exist_ok=True)
 
         self.available: Dict[str, metaFile] = {}
-        self.loaded: Dict[str, List[metaQuestion]] = {}
+        self.files_by_name: Dict[str, metaFile] = {}
+        self._manifest: Optional[Dict[str, Dict]] = None
+        self._manifest_store: Optional[str] = None  # store the manifest's rank histograms were counted from
+
+        # Questions per rank of every scanned deck, index 0 unused: file hash -> [0, rank 1, ..., rank 5]
+        self.rank_histograms: Dict[str, List[int]] = {}
+        self._histograms_changed = False
+        self.loaded: Dict[str, List[metaQuestion]] = {}  # a lazyDeck when loaded lazily
+
+        # Rank of every loaded question, one byte each indexed by question number - 1.
+        # Loaded questions read and write their rank here.
+        self.rank_arrays: Dict[str, array] = {}
+
+        # How the next question is picked, see SCHEDULERS
+        self.scheduler: scheduler = leitnerScheduler(self)
+
+        # Worker thread for select_files_async
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Worker processes for parsing and counting many files at once, started on first use
+        self.parse_workers = os.cpu_count() or 1
+        self.parallel_min_files = PARALLEL_MIN_FILES
+        self._process_pool = None
+
+        # Parsed metadata per .meta.json path, the single source of truth while running
+        self._meta_cache: Dict[Path, Dict] = {}
+        self._dirty: set = set()
+        # Saved with changes left in the store's journal, written out in full by close()
+        self._journaled: set = set()
+        self._lock = threading.RLock()
+        self._flush_timer: Optional[threading.Timer] = None
+        self.flush_delay = FLUSH_DELAY
+        self.io_counters = {
+            "reads": 0,
+            "reads_avoided": 0,
+            "writes": 0,
+            "writes_avoided": 0,
+        }
+
+        # Log of every graded answer, opened on first use
+        self._history: Optional[reviewHistory] = None
+
+        self.store: metaStore = jsonMetaStore()
+        self.store_kind = "json"
+        self.open_store(store)
+
+    def open_store(self, kind: str = "json"):
+        """
+        Choose where metadata is persisted: "json" keeps a .meta.json per deck,
+        "sqlite" keeps every deck in one database in the questions directory and
+        imports the existing .meta.json files the first time it is opened.
+        """
+        with self._lock:
+            self.flush()
+            if kind == "sqlite":
+                store = sqliteMetaStore(self.questions_dir / DATABASE_NAME)
+                imported = import_json_metadata(store, self.questions_dir)
+                if imported:
+                    print(f"Imported metadata of {imported} file(s) into {DATABASE_NAME}")
+            elif kind == "json":
+                store = jsonMetaStore()
+            else:
+                raise ValueError(f"Unknown metadata store {kind}")
+
+            self.store.close()
+            self.store = store
+            self.store_kind = kind
+            self._meta_cache.clear()
+
+            # The new store may hold other rankings than the histograms were counted from
+            for file_hash in list(self.rank_histograms):
+                self._set_histogram(file_hash, self._histogram(self.get_rankings(file_hash)))
+
+    def load_cached_files(self) -> List[metaFile]:
+        """
+        Fill the file list from the scan manifest alone, without opening any question
+        or metadata file, so a window can show it right away. Files whose manifest entry
+        has no rank histogram are left to scan_files, which afterwards reports
+        everything that changed since the manifest was written.
+        """
+        loaded = []
+        # The flush timer saves the manifest from these dicts on its own thread
+        with self._lock:
+            for filename, entry in self._load_manifest().items():
+                if filename in self.files_by_name:
+                    continue
+                ranks = self._manifest_ranks(filename, entry)
+                if ranks is None:
+                    continue
+                file_obj = metaFile(
+                    filepath = self.questions_dir / filename,
+                    hash = entry['hash'],
+                    filename = filename,
+                    total_questions = entry['total_questions'],
+                    last_updated = entry['last_updated']
+                )
+                self.available[file_obj.hash] = file_obj
+                self.files_by_name[filename] = file_obj
+                self.rank_histograms[file_obj.hash] = ranks
+                loaded.append(file_obj)
+        return loaded
 
-    def scan_files(self) -> List[metaFile]:
+    def scan_files(self) -> scanResult:
         """
-        Looks for .md and .csv files in the questions directory, and parses them into the appropriate file objects
+        Looks for .md and .csv files in the questions directory, and parses them into the appropriate file objects.
+        Files whose size and modification time match the scan manifest are not opened again.
+        Returns which files were added, changed, or removed since the previous scan.
         """
-        files = []
+        result = scanResult()
+        manifest = self._load_manifest()
+        manifest_changed = False
+        seen = set()
         
         try:
+            pending = []
             for file in Path(self.questions_dir).glob("*"):
-                if file.suffix in [".md", ".csv"]:
-                    file_meta = file.with_suffix('.meta.json')
-                    file_hash = self._get_file_hash(file, file_meta)
-                    metadata = self._load_or_create_meta(file, file_meta, file_hash)
+                if file.suffix not in [".md", ".csv"]:
+                    continue
+
+                seen.add(file.name)
+                stat = file.stat()
+                current = self.files_by_name.get(file.name)
+                entry = manifest.get(file.name)
+
+                if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                    if current is not None:
+                        continue  # Unchanged since the last scan
+                    pending.append((file, stat, current, entry, False, False))
+                else:
+                    has_meta = self._has_meta(file.with_suffix('.meta.json'))
+                    # Edited since this manager or the manifest last saw it, also while the app was closed
+                    edited = current is not None or entry is not None
+                    # New files and edited sources need their questions counted
+                    pending.append((file, stat, current, None, edited or not has_meta, edited))
 
+            # Counting reads every file in full, so spread it over worker processes
+            to_count = [(file,) for file, _, _, _, needs_count, _ in pending if needs_count]
+            counts = dict(zip(
+                (file for file, in to_count),
+                self._map_files(metaManager._parse_question_count, to_count)
+            ))
+
+            for file, stat, current, entry, _, edited in pending:
+                if entry is not None:
                     file_obj = metaFile(
                         filepath = file,
-                        hash = file_hash,
+                        hash = entry['hash'],
                         filename = file.name,
-                        total_questions = metadata['total_questions'],
-                        last_updated = metadata['last_updated']
+                        total_questions = entry['total_questions'],
+                        last_updated = entry['last_updated']
                     )
-                    files.append(file_obj)
-                    self.available[file_hash] = file_obj
+                else:
+                    file_obj = self._scan_file(file, recount = edited, qcount = counts.get(file))
+
+                # The flush timer saves the manifest from these dicts on its own thread
+                with self._lock:
+                    if entry is None:
+                        manifest[file.name] = {
+                            "size": stat.st_size,
+                            "mtime_ns": stat.st_mtime_ns,
+                            "hash": file_obj.hash,
+                            "total_questions": file_obj.total_questions,
+                            "last_updated": file_obj.last_updated,
+                        }
+                        manifest_changed = True
+
+                    if current is not None:
+                        file_obj.is_selected = current.is_selected
+                        self.available.pop(current.hash, None)
+                    if edited:
+                        result.changed.append(file_obj)
+                    else:
+                        result.added.append(file_obj)
+
+                    self.available[file_obj.hash] = file_obj
+                    self.files_by_name[file_obj.filename] = file_obj
+
+                    ranks = self._manifest_ranks(file.name, entry) if entry is not None else None
+                    if ranks is not None:
+                        self.rank_histograms[file_obj.hash] = ranks
+                    else:
+                        # Metadata was just read for new and changed files, older manifests lack ranks,
+                        # and saved ranks can be outdated (see _manifest_ranks)
+                        self.rank_histograms[file_obj.hash] = self._histogram(self.get_rankings(file_obj.hash))
+                        manifest_changed = True
+
+            with self._lock:
+                for filename in [name for name in self.files_by_name if name not in seen]:
+                    file_obj = self.files_by_name.pop(filename)
+                    self.available.pop(file_obj.hash, None)
+                    self.rank_histograms.pop(file_obj.hash, None)
+                    if manifest.pop(filename, None) is not None:
+                        manifest_changed = True
+                    if file_obj.hash in self.loaded:
+                        self._unload_deck(file_obj.hash)
+                        self._rebuild_scheduler()
+                    result.removed.append(file_obj)
         except Exception as e:
             print(f"Error during scanning: {e}")
 
-        return files
+        if manifest_changed:
+            self._save_manifest()
+
+        return result
+
+    def _scan_file(self, file: Path, recount: bool = False, qcount: Optional[int] = None) -> metaFile:
+        """Read (or create) the metadata of a new or changed question file"""
+        file_meta = file.with_suffix('.meta.json')
+        file_hash = self._get_file_hash(file, file_meta)
+        recount = recount and self._has_meta(file_meta)
+        metadata = self._load_or_create_meta(file, file_meta, file_hash, qcount)
+
+        if recount:
+            # The source was edited, so its question count may have changed
+            with self._lock:
+                if qcount is None:
+                    qcount = self._parse_question_count(file)
+                if qcount != metadata['total_questions']:
+                    metadata['total_questions'] = qcount
+                    self._mark_dirty(file_meta)
+
+        return metaFile(
+            filepath = file,
+            hash = file_hash,
+            filename = file.name,
+            total_questions = metadata['total_questions'],
+            last_updated = metadata['last_updated']
+        )
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        """Load the scan manifest, reading it from disk only once"""
+        with self._lock:
+            if self._manifest is None:
+                self._manifest = {}
+                manifest_path = self.questions_dir / MANIFEST_NAME
+                if manifest_path.exists():
+                    try:
+                        with open(manifest_path, 'r') as f:
+                            data = json.load(f)
+                        self._manifest = data['files']
+                        self._manifest_store = data.get('store', "json")
+                    except Exception as e:
+                        print(f"Ignoring unreadable scan manifest: {e}")
+            return self._manifest
+
+    def _manifest_ranks(self, filename: str, entry: Dict) -> Optional[List[int]]:
+        """
+        The rank histogram the manifest keeps for a file, [0, rank 1, ..., rank 5],
+        or None if it may not match the metadata: counted from another store, or
+        rank changes were journaled after it was saved (the app did not close cleanly).
+        """
+        ranks = entry.get('ranks')
+        if ranks is None or len(ranks) != 5 or self._manifest_store != self.store_kind:
+            return None
+        if self.store.has_unsaved_changes((self.questions_dir / filename).with_suffix('.meta.json')):
+            return None
+        return [0] + ranks
+
+    def _save_manifest(self):
+        """
+        Write the scan manifest next to the question files, with the current rank histograms.
+        Runs on the flush timer's thread too, so everything it reads is changed under the lock.
+        """
+        with self._lock:
+            self._load_manifest()
+            for filename, entry in self._manifest.items():
+                file_obj = self.files_by_name.get(filename)
+                histogram = self.rank_histograms.get(file_obj.hash) if file_obj is not None else None
+                if histogram is not None:
+                    entry['ranks'] = histogram[1:]
+                else:
+                    entry.pop('ranks', None)
+            self._histograms_changed = False
+            self._manifest_store = self.store_kind
+
+            try:
+                with open(self.questions_dir / MANIFEST_NAME, 'w') as f:
+                    json.dump({"files": self._manifest, "store": self.store_kind}, f)
+            except Exception as e:
+                print(f"Error writing scan manifest: {e}")
     
+    def get_file(self, filename: str) -> Optional[metaFile]:
+        """Look up a scanned file by its filename"""
+        return self.files_by_name.get(filename)
+
     def get_hashes(self, filenames: List[str]) -> List[str]:
 
         hashes = []
         for filename in filenames:
-            for hash_val, file_obj in self.available.items():
-                if file_obj.filename == filename:
-                    hashes.append(hash_val)
-                    break
+            file_obj = self.files_by_name.get(filename)
+            if file_obj is not None:
+                hashes.append(file_obj.hash)
         return hashes
 
-    def select_files(self, filenames: List[str]):
+    def select_files(self, filenames: List[str], lazy: bool = False):
         """
-        Enables question files and loads their questions
+        Enables question files and loads their questions.
+        With lazy set, questions are only indexed and get parsed from the source when drawn.
         """
         for file_obj in self.available.values():
             file_obj.is_selected = False
 
-        self.loaded.clear()
+        for hash_val in list(self.loaded):
+            self._unload_deck(hash_val)
 
         # Load only selected files
-        hashes = self.get_hashes(filenames)
-        for hash_val in hashes:
-            if hash_val in self.available:
-                file_obj = self.available[hash_val]
-                file_obj.is_selected = True
-                self.loaded[hash_val] = self._parse_questions(file_obj)
+        files = [self.available[hash_val] for hash_val in self.get_hashes(filenames)]
+        for file_obj in files:
+            file_obj.is_selected = True
+
+        if lazy:
+            for file_obj in files:
+                self._load_deck(file_obj.hash, self._index_questions_lazily(file_obj))
+        else:
+            for file_obj, questions in zip(files, self._parse_files(files)):
+                self._load_deck(file_obj.hash, questions)
+
+        self._rebuild_scheduler()
+
+    def _parse_files(self, files: List[metaFile]) -> List[List[metaQuestion]]:
+        """Parse several files, in parallel when there are enough of them. Results keep the order of files."""
+        return self._map_files(metaManager._parse_source, [self._parse_job(file_obj) for file_obj in files])
+
+    def _parse_job(self, file_obj: metaFile) -> Tuple[Path, metaFile, Dict[str, int]]:
+        """Arguments of _parse_source for a file, reading (or creating) its metadata here"""
+        meta_path = file_obj.filepath.with_suffix('.meta.json')
+        rankings = self._load_or_create_meta(file_obj.filepath, meta_path, file_obj.hash)['rankings']
+        return self._get_deck_cache(file_obj.hash), file_obj, rankings
+
+    def _use_process_pool(self, jobs: int) -> bool:
+        return self.parse_workers > 1 and jobs >= self.parallel_min_files
+
+    def _get_process_pool(self):
+        """The worker processes, started on first use and kept until close"""
+        with self._lock:
+            if self._process_pool is None:
+                # Imported here, it pulls in multiprocessing which costs startup time
+                from concurrent.futures import ProcessPoolExecutor
+                self._process_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+            return self._process_pool
+
+    def _close_process_pool(self):
+        with self._lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+                self._process_pool = None
+
+    def _map_files(self, func, jobs: List[Tuple]) -> List:
+        """
+        Run func(*job) for every job, on the process pool once there are parallel_min_files
+        jobs or more. Results come back in job order either way.
+        """
+        if self._use_process_pool(len(jobs)):
+            try:
+                return list(self._get_process_pool().map(func, *zip(*jobs)))
+            except Exception as e:
+                print(f"Parallel parsing failed, parsing serially: {e}")
+                self._close_process_pool()
+        return [func(*job) for job in jobs]
+
+    def select_files_async(self, filenames: List[str], on_deck=None, on_progress=None,
+                           on_done=None, lazy: bool = False) -> loadJob:
+        """
+        Like select_files, but the decks are loaded in the background. A worker thread
+        parses them one after another, or hands them to the process pool when there are
+        enough of them (see select_files), and passes each one on as soon as it is done.
+        Callbacks run on the worker thread:
+            on_progress(job, file_obj, index, total) before a deck is parsed, or when
+                it is done on the process pool
+            on_deck(job, file_obj, deck) once it is parsed, hand the deck to add_loaded_deck
+                from the thread that uses the manager
+            on_done(job) after the last deck, or after cancelling
+        """
+        for file_obj in self.available.values():
+            file_obj.is_selected = False
+
+        for hash_val in list(self.loaded):
+            self._unload_deck(hash_val)
+        self._rebuild_scheduler()
+
+        files = [self.available[hash_val] for hash_val in self.get_hashes(filenames)]
+        for file_obj in files:
+            file_obj.is_selected = True
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="deck-loader")
+
+        job = loadJob(files)
+        job.future = self._executor.submit(self._run_load_job, job, on_deck, on_progress, on_done, lazy)
+        return job
+
+    def _run_load_job(self, job: loadJob, on_deck, on_progress, on_done, lazy: bool):
+        """Parse the decks of a load job, runs on the worker thread"""
+        try:
+            total = len(job.files)
+            finished = set()  # filenames, so a failing process pool does not pass on (or report) a deck twice
+            if not lazy and self._use_process_pool(total):
+                try:
+                    self._run_load_job_in_pool(job, on_deck, on_progress, finished)
+                    return
+                except BrokenExecutor as e:
+                    print(f"Parallel parsing failed, parsing serially: {e}")
+                    self._close_process_pool()
 
+            for index, file_obj in enumerate(job.files):
+                if job.cancelled:
+                    break
+                if file_obj.filename in finished:
+                    continue
+                if on_progress:
+                    on_progress(job, file_obj, index, total)
+
+                try:
+                    if lazy:
+                        deck = self._index_questions_lazily(file_obj)
+                    else:
+                        deck = self._parse_questions(file_obj)
+                except Exception as e:
+                    print(f"Error loading {file_obj.filename}: {e}")
+                    continue
+
+                if job.cancelled:
+                    if isinstance(deck, lazyDeck):
+                        deck.close()
+                    break
+                if on_deck:
+                    on_deck(job, file_obj, deck)
+        finally:
+            if on_done:
+                on_done(job)
+
+    def _run_load_job_in_pool(self, job: loadJob, on_deck, on_progress, finished: set):
+        """
+        Parse the decks of a load job on the process pool, passing each on in the order they finish.
+        Adds the filenames it is done with, delivered or failed, to finished.
+        """
+        pool = self._get_process_pool()
+        total = len(job.files)
+        futures = {}
+        try:
+            for file_obj in job.files:
+                try:
+                    # Reads (or creates) the metadata, which can fail like parsing
+                    futures[pool.submit(metaManager._parse_source, *self._parse_job(file_obj))] = file_obj
+                except BrokenExecutor:
+                    raise
+                except Exception as e:
+                    print(f"Error loading {file_obj.filename}: {e}")
+                    finished.add(file_obj.filename)
+
+            for index, future in enumerate(as_completed(futures), len(finished)):
+                if job.cancelled:
+                    break
+                file_obj = futures[future]
+                if on_progress:
+                    on_progress(job, file_obj, index, total)
+
+                try:
+                    deck = future.result()
+                except BrokenExecutor:
+                    raise
+                except Exception as e:
+                    print(f"Error loading {file_obj.filename}: {e}")
+                    finished.add(file_obj.filename)
+                    continue
+
+                finished.add(file_obj.filename)
+                if job.cancelled:
+                    break
+                if on_deck:
+                    on_deck(job, file_obj, deck)
+        finally:
+            # Decks not started yet are dropped after cancelling, or after the pool broke
+            for future in futures:
+                future.cancel()
+
+    def add_loaded_deck(self, file_obj: metaFile, deck):
+        """Make a deck parsed by select_files_async available for drawing"""
+        if not file_obj.is_selected or self.available.get(file_obj.hash) is not file_obj:
+            # Deselected or rescanned while it was loading
+            if isinstance(deck, lazyDeck):
+                deck.close()
+            return
+
+        if file_obj.hash in self.loaded:
+            self._unload_deck(file_obj.hash)
+            self._rebuild_scheduler()
+
+        self._load_deck(file_obj.hash, deck)
+        self.scheduler.add_deck(file_obj.hash, deck)
 
     def deselect_files(self, filenames: List[str]):
         """
@@ -121,38 +1208,99 @@ class metaManager:
                 self.available[hash_val].is_selected = False
 
                 if hash_val in self.loaded:
-                    del self.loaded[hash_val]
+                    self._unload_deck(hash_val)
+
+        self._rebuild_scheduler()
+
+    def _load_deck(self, file_hash: str, deck):
+        """Register a parsed (or lazily indexed) deck and move its ranks into a rank array"""
+        if isinstance(deck, lazyDeck):
+            ranks = deck.ranks
+        else:
+            # Parsers number questions 1, 2, ... in order, so index i is question i + 1
+            ranks = rank_array(question.rank for question in deck)
+            for question in deck:
+                question.attach_rank(ranks)
+        self.loaded[file_hash] = deck
+        self.rank_arrays[file_hash] = ranks
+
+    def _unload_deck(self, file_hash: str):
+        """Drop a loaded deck and everything that refers to its questions"""
+        deck = self.loaded.pop(file_hash)
+        self.rank_arrays.pop(file_hash, None)
+        if isinstance(deck, lazyDeck):
+            deck.close()
+
+    def _rebuild_scheduler(self):
+        """Let the scheduler start over from all loaded decks"""
+        self.scheduler.rebuild()
+
+    def set_scheduler(self, strategy: scheduler):
+        """Use another scheduler strategy, e.g. for one session"""
+        self.scheduler = strategy
+        self._rebuild_scheduler()
+
+    def set_scheduler_mode(self, mode: str):
+        """Choose how questions are picked for this session, one of the names in SCHEDULERS"""
+        if mode not in SCHEDULERS:
+            raise ValueError(f"Unknown scheduler mode {mode}")
+        self.set_scheduler(SCHEDULERS[mode](self))
+
+    def _get_schedule(self, file_hash: str) -> Dict[str, List]:
+        """SM-2 state of a file's questions: question id -> [interval (days), ease, due timestamp, repetitions]"""
+        file_obj = self.available[file_hash]
+        with self._lock:
+            metadata = self._load_or_create_meta(file_obj.filepath, self._get_meta(file_hash), file_hash)
+            return metadata.setdefault('schedule', {})
+
+    def _set_schedule_entry(self, file_hash: str, question_number: int, entry: List):
+        """Store the SM-2 state of one question"""
+        meta_path = self._get_meta(file_hash)
+        with self._lock:
+            self._get_schedule(file_hash)[f"{question_number:03d}"] = entry
+            if self.store.record_schedule(meta_path, self._read_meta(meta_path), question_number, entry):
+                self._write_meta(meta_path)
+            else:
+                self._mark_dirty(meta_path, recorded = True)
+
 
     def update_rank(self, file_hash: str, question_number: int, new_rank: int):
         """Update ranking for a specific question"""
         meta_path = self._get_meta(file_hash)
-        
-        if meta_path.exists():
-            with open(meta_path, 'r') as f:
-                metadata = json.load(f)
-        else:
-            file_obj = self.available[file_hash]
-            metadata = self._load_or_create_meta(
-                file_obj.filepath, 
-                meta_path, 
-                file_hash
-            )
+        file_obj = self.available[file_hash]
+        now = datetime.datetime.now()
 
-        question_id = f"{question_number:03d}"
-        metadata['rankings'][question_id] = new_rank
-        metadata['last_updated'] = datetime.datetime.now().isoformat()
+        with self._lock:
+            metadata = self._load_or_create_meta(file_obj.filepath, meta_path, file_hash)
 
-        with open(meta_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
-        
-        if file_hash in self.loaded:
-            for question in self.loaded[file_hash]:
-                if question.question_number == question_number:
-                    question.rank = new_rank
-                    break
+            question_id = f"{question_number:03d}"
+            old_rank = metadata['rankings'].get(question_id)
+            metadata['rankings'][question_id] = new_rank
+            metadata['last_updated'] = now.isoformat()
+            self._move_rank(file_hash, old_rank, new_rank)
+
+            if self.store.record_rank(meta_path, metadata, question_number, new_rank, now.timestamp()):
+                self._write_meta(meta_path)
+            else:
+                self._mark_dirty(meta_path, recorded = True)
+
+        # Loaded questions read their rank from here
+        ranks = self.rank_arrays.get(file_hash)
+        if ranks is not None and 0 < question_number <= len(ranks):
+            ranks[question_number - 1] = new_rank
+        self.scheduler.on_rank_changed(file_hash, question_number, new_rank)
+
+    def get_loaded_question(self, file_hash: str, question_number: int) -> Optional[metaQuestion]:
+        """Find a loaded question, materializing it if its deck is lazy"""
+        deck = self.loaded.get(file_hash)
+        if isinstance(deck, lazyDeck):
+            return deck.question(question_number)
+        if deck is not None and 0 < question_number <= len(deck):
+            return deck[question_number - 1]  # questions are numbered 1, 2, ... in order
+        return None
 
     def get_question_by_id(self, question_id: str) -> Optional[metaQuestion]:
-        """Retrieve a specific question by its full ID"""
+        """Retrieve a specific question by its full ID, e.g. "ab12cd34-007" (or "ab12cd34-7")"""
         parts = question_id.split('-')
         if len(parts) != 2:
             return None
@@ -160,12 +1308,7 @@ class metaManager:
         file_hash = parts[0]
         question_num = int(parts[1])
         
-        if file_hash in self.loaded:
-            for question in self.loaded[file_hash]:
-                if question.question_number == question_num:
-                    return question
-        
-        return None
+        return self.get_loaded_question(file_hash, question_num)
 
     def get_all_loaded_questions(self) -> List[metaQuestion]:
         """Get all questions from all loaded files"""
@@ -205,15 +1348,11 @@ class metaManager:
     def reset_metadata(self, filename: str):
         """Reset the .meta.json file"""
 
-        file_hash = None
-        for hash_val, file_obj in self.available.items():
-            if file_obj.filename == filename:
-                file_hash = hash_val
-        
-        if file_hash not in self.available:
-            raise ValueError(f"File with hash {file_hash} not found")
+        file_obj = self.get_file(filename)
+        if file_obj is None:
+            raise ValueError(f"File {filename} not found")
         
-        file_obj = self.available[file_hash]
+        file_hash = file_obj.hash
         meta_path = self._get_meta(file_hash)
         
         metadata = {
@@ -224,39 +1363,148 @@ class metaManager:
             "rankings": {f"{i+1:03d}": 2 for i in range(file_obj.total_questions)}
         }
         
-        # Write the reset metadata
-        with open(meta_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        # Write the reset metadata right away, dropping any pending journal entries
+        with self._lock:
+            self._meta_cache[meta_path] = metadata
+            self._write_meta(meta_path)
+            self._set_histogram(file_hash, self._default_histogram(file_obj.total_questions))
+            # No journal is left to show the saved histogram is outdated, so save it along
+            self._save_manifest()
         
         print(f"Reset metadata for {file_obj.filename}")
         
         # Also update in-memory questions if loaded
-        if file_hash in self.loaded:
-            for question in self.loaded[file_hash]:
-                question.rank = 2
+        ranks = self.rank_arrays.get(file_hash)
+        if ranks is not None:
+            ranks[:] = array('B', [2]) * len(ranks)
+            self._rebuild_scheduler()
+
+    def export_progress(self, filenames: Optional[List[str]] = None) -> Dict:
+        """
+        Rankings and SM-2 schedules as JSON-compatible data for import_progress,
+        keyed by filename. Exports every scanned file with metadata if filenames is None.
+        """
+        if filenames is None:
+            filenames = sorted(self.files_by_name)
+
+        decks = {}
+        with self._lock:
+            for filename in filenames:
+                file_obj = self.get_file(filename)
+                if file_obj is None:
+                    raise ValueError(f"File {filename} not found")
+                meta_path = self._get_meta(file_obj.hash)
+                if not self._has_meta(meta_path):
+                    continue
+                metadata = self._read_meta(meta_path)
+                decks[filename] = {
+                    "file_hash": file_obj.hash,
+                    "total_questions": metadata['total_questions'],
+                    "last_updated": metadata['last_updated'],
+                    "rankings": dict(metadata['rankings']),
+                    "schedule": {key: list(entry) for key, entry in metadata.get('schedule', {}).items()},
+                }
+
+        return {
+            "version": PROGRESS_VERSION,
+            "exported": datetime.datetime.now().isoformat(),
+            "decks": decks
+        }
 
-    def get_weighted_random_question(self) -> Optional[metaQuestion]:
+    def import_progress(self, data: Dict) -> List[str]:
         """
-        Get a random question weighted by rank.
-        Lower ranks (1) appear more often than higher ranks (5)
+        Replace the rankings (and SM-2 schedules, if present) of scanned files with
+        exported ones, matched by filename. Returns the filenames that were imported.
         """
-        all_questions = self.get_all_loaded_questions()
-        if not all_questions:
+        if data.get("version") != PROGRESS_VERSION:
+            raise ValueError(f"Unsupported progress format version {data.get('version')}")
+
+        imported = []
+        for filename, deck in data.get("decks", {}).items():
+            file_obj = self.get_file(filename)
+            if file_obj is None:
+                print(f"Warning: Skipping {filename}, it is not in the questions directory")
+                continue
+
+            file_hash = file_obj.hash
+            meta_path = self._get_meta(file_hash)
+            # Every question of the file gets a rank, like a reset: 2 unless a valid one was exported
+            exported = deck.get("rankings", {})
+            rankings = {}
+            for i in range(file_obj.total_questions):
+                key = f"{i+1:03d}"
+                rank = exported.get(key)
+                rankings[key] = rank if isinstance(rank, int) and 1 <= rank <= 5 else 2
+
+            # Written right away like a reset, dropping any pending journal entries
+            with self._lock:
+                metadata = self._load_or_create_meta(file_obj.filepath, meta_path, file_hash)
+                metadata['rankings'] = rankings
+                if "schedule" in deck:
+                    metadata['schedule'] = deck["schedule"]
+                metadata['last_updated'] = datetime.datetime.now().isoformat()
+                self._write_meta(meta_path)
+                self._set_histogram(file_hash, self._histogram(rankings))
+                self._save_manifest()  # like reset_metadata
+
+            ranks = self.rank_arrays.get(file_hash)
+            if ranks is not None:
+                ranks[:] = rank_array(rankings.get(f"{number:03d}", 2) for number in range(1, len(ranks) + 1))
+            imported.append(filename)
+
+        if imported:
+            self._rebuild_scheduler()
+        return imported
+
+    def record_answer(self, question: metaQuestion, correct: bool, old_rank: int, new_rank: int,
+                      response_ms: int):
+        """Append a graded answer to the review history"""
+        self._get_history().append(
+            question.hash, question.question_number, correct, old_rank, new_rank, response_ms
+        )
+
+    def get_history(self, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                    filenames: Optional[List[str]] = None) -> Iterator[reviewEvent]:
+        """
+        Review events in time order, from start up to (not including) end,
+        optionally only those of the given files
+        """
+        file_hashes = None
+        if filenames is not None:
+            file_hashes = self.get_hashes(filenames)
+        return self._get_history().events(
+            start = start.timestamp() if start is not None else None,
+            end = end.timestamp() if end is not None else None,
+            file_hashes = file_hashes
+        )
+
+    def _get_history(self) -> reviewHistory:
+        if self._history is None:
+            self._history = reviewHistory(self.questions_dir / HISTORY_NAME)
+        return self._history
+
+    def get_next_question(self) -> Optional[metaQuestion]:
+        """The next question to ask, as picked by the scheduler"""
+        drawn = self.scheduler.pick_next()
+        if drawn is None:
             return None
-        
-        # Create weighted list
-        weighted_questions = []
-        for question in all_questions:
-            weight = rank_weights.get(question.rank, 1)
-            weighted_questions.extend([question] * weight)
-        
-        return random.choice(weighted_questions)
+        return self.get_loaded_question(*drawn)
+
+    def display_rank(self, question: metaQuestion) -> int:
+        """Stars to show for a question in the current scheduler mode"""
+        return self.scheduler.display_rank(question)
+
+    def answer_question(self, question: metaQuestion, correct: bool):
+        """Let the scheduler update rank (and schedule) after a question was answered"""
+        if correct:
+            self.scheduler.on_correct(question)
+        else:
+            self.scheduler.on_incorrect(question)
 
     def _get_file_hash(self, file: Path, meta: Path) -> str:
         """Generate or retrieve file hash"""
-        if meta.exists():
-            with open(meta, 'r') as f:
-                return json.load(f)['file_hash']
+        if self._has_meta(meta):
+            return self._read_meta(meta)['file_hash']
         
         hash_obj = hashlib.md5(file.name.encode('utf-8'))
         return hash_obj.hexdigest()[:8]
@@ -266,18 +1514,190 @@ class metaManager:
         file_obj = self.available[file_hash]
         return file_obj.filepath.with_suffix('.meta.json')
 
+    def _has_meta(self, meta: Path) -> bool:
+        """Whether a file already has metadata, cached or stored"""
+        return meta in self._meta_cache or self.store.exists(meta)
+
+    def _read_meta(self, meta: Path) -> Dict:
+        """
+        Get the metadata of a file, reading it from the store only the first time.
+        If the store reports a stale snapshot (e.g. a replayed journal) the file
+        is marked dirty so the next flush saves it again.
+        """
+        with self._lock:
+            metadata = self._meta_cache.get(meta)
+            if metadata is not None:
+                self.io_counters["reads_avoided"] += 1
+                return metadata
+
+            metadata, stale = self.store.load(meta)
+            self.io_counters["reads"] += 1
+
+            if stale:
+                self._dirty.add(meta)
+                self._schedule_flush()
+                # Rank changes were recovered that the saved histogram may not have seen
+                if metadata.get('file_hash') in self.rank_histograms:
+                    self._set_histogram(metadata['file_hash'], self._histogram(metadata['rankings']))
+
+            self._meta_cache[meta] = metadata
+            return metadata
+
+    def _write_meta(self, meta: Path, full: bool = True):
+        """Save the cached metadata, full=False only writes the pending changes the store was told about"""
+        with self._lock:
+            metadata = self._meta_cache.get(meta)
+            if metadata is None:
+                return
+
+            if self.store.save(meta, metadata, full):
+                self.io_counters["writes"] += 1
+                if full:
+                    self._journaled.discard(meta)
+            else:
+                self.io_counters["writes_avoided"] += 1
+                self._journaled.add(meta)
+            self._dirty.discard(meta)
+
+    def _mark_dirty(self, meta: Path, recorded: bool = False):
+        """
+        Queue cached metadata for the next debounced flush. recorded=True when the
+        change was passed to the store's record_rank or record_schedule already.
+        """
+        with self._lock:
+            if not recorded:
+                self.store.record_change(meta)
+            if meta in self._dirty:
+                # Coalesced with a write that is already pending
+                self.io_counters["writes_avoided"] += 1
+            self._dirty.add(meta)
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        """(Re)start the quiet period timer, flushing once no changes come in"""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+        self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def flush(self, fold: bool = False):
+        """
+        Write every dirty metadata file to the store, as one batch, then the changed rank histograms.
+        fold=True also rewrites the files whose rank changes were left in a journal (on exit).
+        """
+        with self._lock:
+            with self.store.batch():
+                for meta in list(self._dirty):
+                    try:
+                        self._write_meta(meta, full = False)
+                    except Exception as e:
+                        print(f"Error writing metadata {meta.name}: {e}")
+                if fold:
+                    for meta in list(self._journaled):
+                        try:
+                            self._write_meta(meta)
+                        except Exception as e:
+                            print(f"Error writing metadata {meta.name}: {e}")
+            if self._histograms_changed:
+                self._save_manifest()
+
+    def close(self):
+        """Stop the flush timer and write everything out, call this on exit"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._close_process_pool()
+
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self.flush(fold = True)
+            self.store.close()
+
+            if self._history is not None:
+                self._history.close()
+                self._history = None
+
+    def get_rankings(self, file_hash: str) -> Dict[str, int]:
+        """Current rankings of a file, including journaled changes"""
+        meta_path = self._get_meta(file_hash)
+        if not self._has_meta(meta_path):
+            return {}
+        return self._load_ranks(meta_path)
+
+    def get_rank_counts(self, filenames: List[str], mode: str = leitnerScheduler.name) -> Dict[int, int]:
+        """Number of questions per rank (1-5) over the given files, from the rank histograms"""
+        return self.get_rank_summary(filenames, mode)["counts"]
+
+    def get_rank_summary(self, filenames: List[str], mode: str = leitnerScheduler.name) -> Dict:
+        """
+        Rank counts, percentages and mastery ratio over the given files, combined and
+        per file (see rankstats.summarize). Files without metadata are left out.
+        mode "sm2" counts the stars derived from the SM-2 schedules instead of the
+        saved ranks, which reads the metadata of the files.
+        """
+        if mode not in SCHEDULERS:
+            raise ValueError(f"Unknown scheduler mode {mode}")
+        histograms = {}
+        with self._lock:
+            for filename in filenames:
+                file_obj = self.files_by_name.get(filename)
+                if file_obj is None:
+                    continue
+                if mode == sm2Scheduler.name:
+                    if self._has_meta(self._get_meta(file_obj.hash)):
+                        histograms[filename] = sm2Scheduler.histogram(
+                            self._get_schedule(file_obj.hash), file_obj.total_questions
+                        )
+                    continue
+                histogram = self.rank_histograms.get(file_obj.hash)
+                if histogram is not None:
+                    histograms[filename] = list(histogram)
+        return summarize(histograms)
+
+    @staticmethod
+    def _histogram(rankings: Dict[str, int]) -> List[int]:
+        """Count rankings per rank, [0, rank 1, ..., rank 5]"""
+        return count_ranks(rank_array(rankings.values()))
+
+    @staticmethod
+    def _default_histogram(total_questions: int) -> List[int]:
+        """Histogram of a new or reset deck, every question starts at rank 2"""
+        histogram = [0] * 6
+        histogram[2] = total_questions
+        return histogram
+
+    def _set_histogram(self, file_hash: str, histogram: List[int]):
+        with self._lock:
+            if self.rank_histograms.get(file_hash) != histogram:
+                self.rank_histograms[file_hash] = histogram
+                self._histograms_changed = True
+
+    def _move_rank(self, file_hash: str, old_rank: Optional[int], new_rank: int):
+        """Move one question from old_rank to new_rank in its deck's histogram"""
+        histogram = self.rank_histograms.get(file_hash)
+        if histogram is None or old_rank == new_rank:
+            return
+        if old_rank is not None and 1 <= old_rank <= 5:
+            histogram[old_rank] -= 1
+        if 1 <= new_rank <= 5:
+            histogram[new_rank] += 1
+        self._histograms_changed = True
+
     def _load_ranks(self, meta: Path) -> Dict[str, int]:
         """Load rankings from metadata file"""
-        with open(meta, 'r') as f:
-            return json.load(f)['rankings']
+        return self._read_meta(meta)['rankings']
 
-    def _load_or_create_meta(self, file: Path, meta: Path, file_hash: str) -> Dict:
+    def _load_or_create_meta(self, file: Path, meta: Path, file_hash: str,
+                             qcount: Optional[int] = None) -> Dict:
         """Load existing metadata or create new"""
-        if meta.exists():
-            with open(meta, 'r') as f:
-                return json.load(f)
+        if self._has_meta(meta):
+            return self._read_meta(meta)
         
-        qcount = self._parse_question_count(file)
+        if qcount is None:
+            qcount = self._parse_question_count(file)
 
         metadata = {
             "file_hash": file_hash,
@@ -287,8 +1707,11 @@ class metaManager:
             "rankings": {f"{i+1:03d}": 2 for i in range(qcount)}
         }
 
-        with open(meta, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        with self._lock:
+            self._meta_cache[meta] = metadata
+            self._write_meta(meta)
+            if file_hash in self.available:
+                self._set_histogram(file_hash, self._default_histogram(qcount))
         
         return metadata
 
@@ -296,20 +1719,116 @@ class metaManager:
         """
         Parse file into metaQuestion objects. Returns a list of metaQuestion instances.
         """
-        questions = []
         file_path = file_obj.filepath
-        
         meta_path = file_path.with_suffix('.meta.json')
-        rankings = self._load_ranks(meta_path)
+        rankings = self._load_or_create_meta(file_path, meta_path, file_obj.hash)['rankings']
+        return self._parse_source(self._get_deck_cache(file_obj.hash), file_obj, rankings)
+
+    @staticmethod
+    def _parse_source(cache_path: Path, file_obj: metaFile, rankings: Dict[str, int]) -> List[metaQuestion]:
+        """
+        Parse the source file of a deck, or load it from its compiled cache at cache_path.
+        Uses no metadata or other manager state, so it can run in a worker process.
+        """
+        questions = []
+        file_path = file_obj.filepath
+
+        cached = metaManager._load_deck_cache(cache_path, file_obj, rankings)
+        if cached is not None:
+            return cached
         
         if file_path.suffix == '.md':
-            questions = self._parse_markdown(file_path, file_obj.hash, rankings)
+            questions = metaManager._parse_markdown(file_path, file_obj.hash, rankings)
         elif file_path.suffix == '.csv':
-            questions = self._parse_csv(file_path, file_obj.hash, rankings)
+            questions = metaManager._parse_csv(file_path, file_obj.hash, rankings)
+
+        metaManager._save_deck_cache(cache_path, file_obj, questions)
         
         return questions
 
-    def _parse_markdown(self, file_path: Path, file_hash: str, 
+    def _get_deck_cache(self, file_hash: str) -> Path:
+        """Get compiled deck cache path from hash"""
+        return self.questions_dir / CACHE_DIR_NAME / f"{file_hash}.qcache"
+
+    @staticmethod
+    def _load_deck_cache(cache_path: Path, file_obj: metaFile, rankings: Dict[str, int]) -> Optional[List[metaQuestion]]:
+        """
+        Load parsed questions from the compiled cache.
+        Returns None if there is no cache, or it is stale or corrupt.
+        """
+        if not cache_path.exists():
+            return None
+
+        try:
+            stat = file_obj.filepath.stat()
+            with open(cache_path, 'rb') as f:
+                header = f.read(CACHE_HEADER.size)
+                payload = f.read()
+
+            magic, version, size, mtime_ns, crc = CACHE_HEADER.unpack(header)
+            if magic != CACHE_MAGIC or version != PARSER_VERSION:
+                return None
+            if size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+                return None
+            if zlib.crc32(payload) != crc:
+                print(f"Warning: Rebuilding corrupt cache for {file_obj.filename}")
+                return None
+
+            rows = marshal.loads(payload)
+        except Exception as e:
+            print(f"Warning: Rebuilding unreadable cache for {file_obj.filename}: {e}")
+            return None
+
+        file_hash = file_obj.hash
+        questions = []
+        for question_num, text, source, answers, question_type, instruction, line in rows:
+            question_id_key = f"{question_num:03d}"
+            questions.append(metaQuestion(
+                id=f"{file_hash}-{question_id_key}",
+                hash=file_hash,
+                question_number=question_num,
+                text=text,
+                source=source,
+                rank=rankings.get(question_id_key, 2),
+                answers=[{'text': answer, 'is_correct': is_correct} for answer, is_correct in answers],
+                question_type=question_type,
+                instruction=instruction,
+                line=line
+            ))
+        return questions
+
+    @staticmethod
+    def _save_deck_cache(cache_path: Path, file_obj: metaFile, questions: List[metaQuestion]):
+        """Write parsed questions to the compiled cache, keyed by the source fingerprint"""
+        try:
+            stat = file_obj.filepath.stat()
+            rows = [
+                (
+                    q.question_number, q.text, q.source,
+                    tuple(
+                        (text, bool(q.correct_mask >> i & 1)) for i, text in enumerate(q.answer_texts)
+                    ),
+                    q.question_type, q.instruction, q.line
+                )
+                for q in questions
+            ]
+            payload = marshal.dumps(rows)
+            header = CACHE_HEADER.pack(
+                CACHE_MAGIC, PARSER_VERSION, stat.st_size, stat.st_mtime_ns, zlib.crc32(payload)
+            )
+
+            cache_path.parent.mkdir(exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a half-written cache
+            tmp_path = cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(header)
+                f.write(payload)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"Error writing cache for {file_obj.filename}: {e}")
+
+    @staticmethod
+    def _parse_markdown(file_path: Path, file_hash: str, 
                     rankings: Dict[str, int]) -> List[metaQuestion]:
         """
         Parse markdown with format:
@@ -329,44 +1848,113 @@ class metaManager:
         Returns:
             List of metaQuestion objects
         """
-        questions = []
+        return list(metaManager._iter_markdown(file_path, file_hash, rankings))
+
+    @staticmethod
+    def _iter_markdown(file_path: Path, file_hash: str, 
+                    rankings: Dict[str, int], count_only: bool = False) -> Iterator:
+        """
+        Stream questions out of a markdown file one line at a time, so memory stays
+        bounded by the largest question instead of the file size.
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        Args:
+            file_path: Path to the .md file
+            file_hash: Hash identifier for the file
+            rankings: Dictionary mapping question IDs to rank values (1-5)
+            count_only: Only validate questions, see _iter_markdown_lines
         
-        # Split by separator to get question blocks
+        Yields:
+            metaQuestion objects
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            lines = ((line_no, line, 0, 0) for line_no, line in enumerate(f, start=1))
+            yield from metaManager._iter_markdown_lines(lines, file_hash, rankings, count_only)
+
+    @staticmethod
+    def _index_markdown(file_path: Path) -> Iterator[Tuple[int, int, int]]:
+        """Yield (line, start offset, end offset) of every valid question in a markdown file"""
+        with open(file_path, 'rb') as f:
+            yield from metaManager._iter_markdown_lines(metaManager._byte_lines(f), "", {}, count_only=True)
+
+    @staticmethod
+    def _iter_markdown_lines(lines: Iterable[Tuple[int, str, int, int]], file_hash: str,
+                    rankings: Dict[str, int], count_only: bool = False,
+                    first_number: int = 1) -> Iterator:
+        """
+        Markdown parser state machine, fed (line number, text, start offset, end offset) per line.
+        Yields metaQuestion objects, or with count_only just (line, start offset, end offset)
+        for each valid question, the byte range running from its first separator line
+        through the line of the separator that closes its answers.
+        """
         # Each block alternates: Question text | ------- | Answers
-        blocks = re.split(r'\|\s*-+\s*\|', content)
-        
-        question_num = 1
-        i = 1  # Skip first block (header/README)
-        
-        while i < len(blocks):
-            # blocks[i] = question text area
-            # blocks[i+1] = answers area
-            
-            if i + 1 >= len(blocks):
-                break
-            
-            question_block = blocks[i].strip()
-            answer_block = blocks[i + 1].strip()
-            
-            if not question_block or not answer_block:
-                i += 2
+        part = 0  # 0 = header/README, 1 = question block, 2 = answer block
+        question_num = first_number
+        block_start = 0
+
+        has_question = False
+        question_text = None
+        question_line = 0
+        question_type = "single_choice"
+        instruction = ""
+
+        has_answers = False
+        answers = []
+        answer_count = 0
+        source = ""
+
+        for line_no, piece, line_start, line_end in metaManager._markdown_pieces(lines):
+            if piece is None:
+                # Separator: finish the question once its answer block is complete
+                if part == 2:
+                    if has_question and has_answers:
+                        if question_text and answer_count:
+                            if count_only:
+                                yield question_line, block_start, line_end
+                            else:
+                                question_id_key = f"{question_num:03d}"
+                                yield metaQuestion(
+                                    id=f"{file_hash}-{question_id_key}",
+                                    hash=file_hash,
+                                    question_number=question_num,
+                                    text=question_text,
+                                    source=source,
+                                    rank=rankings.get(question_id_key, 2),
+                                    answers=answers,
+                                    question_type=question_type,
+                                    instruction=instruction,
+                                    line=question_line
+                                )
+                            question_num += 1
+                        elif not count_only:
+                            print(f"Warning: Skipped invalid question block at line {question_line} (no text or answers)")
+
+                if part == 1:
+                    part = 2
+                else:
+                    part = 1
+                    block_start = line_start
+                    has_question = False
+                    question_text = None
+                    question_line = line_no
+                    question_type = "single_choice"
+                    instruction = ""
+
+                has_answers = False
+                answers = []
+                answer_count = 0
+                source = ""
                 continue
-            
-            # Parse question text (first non-empty, non-instruction line)
-            question_text = None
-            question_type = "single_choice"
-            instruction = ""
-            
-            for line in question_block.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                
+
+            line = piece.strip()
+            if not line or part == 0:
+                continue
+
+            if part == 1:
+                has_question = True
+                lowered = line.lower()
+
                 # Check for instruction lines and store them
-                if any(phrase in line.lower() for phrase in [
+                if any(phrase in lowered for phrase in [
                     'please choose',
                     'there are',
                     'correct answers to this question'
@@ -375,77 +1963,69 @@ class metaManager:
                     instruction = line.strip('| ').strip()
                     
                     # Detect multiple choice
-                    if 'correct answers' in line.lower() or \
-                    any(f'{num} correct' in line.lower() for num in ['2', '3', '4', '5']):
+                    if 'correct answers' in lowered or \
+                    any(f'{num} correct' in lowered for num in ['2', '3', '4', '5']):
                         question_type = "multiple_choice"
                     continue
                 
                 # First real line is the question
                 if not question_text:
                     question_text = line
-            
-            # Parse answers and source
-            answers = []
-            source = ""
-            
-            for line in answer_block.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                
+                    question_line = line_no
+            else:
+                has_answers = True
+
                 # Answer line: | | Text | True/False |
                 if line.startswith('| |'):
-                    # Remove leading '| |'
-                    remainder = line[3:].strip()
-                    # Split by remaining pipes
-                    parts = [p.strip() for p in remainder.split('|')]
+                    # Remove leading '| |' and split by remaining pipes
+                    parts = [p.strip() for p in line[3:].strip().split('|')]
                     
                     if len(parts) >= 2:
-                        answer_text = parts[0]
-                        is_correct = parts[1].lower() == 'true'
-                        
-                        answers.append({
-                            'text': answer_text,
-                            'is_correct': is_correct
-                        })
+                        answer_count += 1
+                        if not count_only:
+                            answers.append({
+                                'text': parts[0],
+                                'is_correct': parts[1].lower() == 'true'
+                            })
                 
                 # Source line
                 elif line.startswith('Source:'):
                     source = line.replace('Source:', '').strip()
-            
-            # Create question if valid
-            if question_text and answers:
-                question_id_key = f"{question_num:03d}"
-                rank = rankings.get(question_id_key, 2)
-                
-                question_obj = metaQuestion(
-                    id=f"{file_hash}-{question_num:03d}",
-                    hash=file_hash,
-                    question_number=question_num,
-                    text=question_text,
-                    source=source,
-                    rank=rank,
-                    answers=answers,
-                    question_type=question_type,
-                    instruction=instruction
-                )
-                
-                questions.append(question_obj)
-                question_num += 1
+
+    @staticmethod
+    def _markdown_pieces(lines: Iterable[Tuple[int, str, int, int]]) -> Iterator[Tuple[int, Optional[str], int, int]]:
+        """
+        Split lines on the | ------- | separator.
+        Yields (line number, text, start offset, end offset), with None as the text for
+        each separator and one final separator for the end of the file.
+        """
+        line_no = line_end = 0
+        for line_no, line, line_start, line_end in lines:
+            # Cheap check first, most lines cannot contain a separator
+            if '-' in line and '|' in line:
+                pieces = MD_SEPARATOR.split(line)
+                yield line_no, pieces[0], line_start, line_end
+                for piece in pieces[1:]:
+                    yield line_no, None, line_start, line_end
+                    yield line_no, piece, line_start, line_end
             else:
-                print(f"Warning: Skipped invalid question block (no text or answers)")
-            
-            # Move to next question block (skip 2 blocks - we just processed them)
-            i += 2
-        
-        return questions
+                yield line_no, line, line_start, line_end
+        yield line_no + 1, None, line_end, line_end
 
-    #TODO: modify parsing to take the answer selection
-    def _parse_csv(self, file_path: Path, file_hash: str, 
+    @staticmethod
+    def _byte_lines(f, offset: int = 0) -> Iterator[Tuple[int, str, int, int]]:
+        """Decode a binary file line by line, keeping track of byte offsets"""
+        for line_no, raw in enumerate(f, start=1):
+            end = offset + len(raw)
+            yield line_no, raw.decode('utf-8'), offset, end
+            offset = end
+
+    @staticmethod
+    def _parse_csv(file_path: Path, file_hash: str, 
                 rankings: Dict[str, int]) -> List[metaQuestion]:
         """
         Parse CSV file with format:
-        question,answer1,answer2,answer3,answer4,correct,source
+        question,answer1,answer2,...,answerN,correct,source
         
         Args:
             file_path: Path to the .csv file
@@ -455,83 +2035,198 @@ class metaManager:
         Returns:
             List of metaQuestion objects
         """
-        questions = []
+        return list(metaManager._iter_csv(file_path, file_hash, rankings))
+
+    @staticmethod
+    def _iter_csv(file_path: Path, file_hash: str, 
+                rankings: Dict[str, int], count_only: bool = False) -> Iterator:
+        """
+        Stream questions out of a CSV file one row at a time. Any number of answerN
+        columns is picked up from the header, and quoted cells may span several lines.
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
+        Args:
+            file_path: Path to the .csv file
+            file_hash: Hash identifier for the file
+            rankings: Dictionary mapping question IDs to rank values (1-5)
+            count_only: Only validate questions and yield their line numbers
+        
+        Yields:
+            metaQuestion objects (or line numbers when count_only is set)
+        """
+        # newline='' lets the csv module handle newlines inside quoted cells
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+
+            columns = metaManager._csv_columns(header)
             question_num = 1
+            row_line = reader.line_num + 1
             
             for row in reader:
-                # Skip empty rows
-                if not row.get('question', '').strip():
-                    continue
-                
-                answers = []
-                
-                # Parse correct answer(s)
-                correct_str = row.get('correct', '').strip()
-                
-                if not correct_str:
-                    print(f"Warning: Question {question_num} has no correct answer specified")
-                    continue
-                
-                # Determine if multiple choice
-                if ',' in correct_str:
-                    # Multiple correct answers: "1,3,4"
-                    try:
-                        correct_nums = [int(x.strip()) for x in correct_str.split(',')]
-                        question_type = "multiple_choice"
-                    except ValueError:
-                        print(f"Warning: Invalid correct format in question {question_num}: {correct_str}")
-                        continue
-                else:
-                    # Single correct answer: "2"
-                    try:
-                        correct_nums = [int(correct_str)]
-                        question_type = "single_choice"
-                    except ValueError:
-                        print(f"Warning: Invalid correct format in question {question_num}: {correct_str}")
-                        continue
-                
-                # Build answer list from answer1-answer4 columns
-                for i in range(1, 5):
-                    answer_key = f'answer{i}'
-                    answer_text = row.get(answer_key, '').strip()
-                    
-                    if answer_text:  # Only add non-empty answers
-                        answers.append({
-                            'text': answer_text,
-                            'is_correct': i in correct_nums
-                        })
-                
-                # Validate we have at least 2 answers
-                if len(answers) < 2:
-                    print(f"Warning: Question {question_num} has fewer than 2 answers")
-                    continue
-                
-                # Get ranking
-                question_id_key = f"{question_num:03d}"
-                rank = rankings.get(question_id_key, 2)
-                
-                # Create question object
-                question_obj = metaQuestion(
-                    id=f"{file_hash}-{question_num:03d}",
-                    hash=file_hash,
-                    question_number=question_num,
-                    text=row.get('question', ''),
-                    source=row.get('source', ''),
-                    rank=rank,
-                    answers=answers,
-                    question_type=question_type,
-                    instruction=""  # CSV format doesn't have explicit instructions
+                line = row_line
+                row_line = reader.line_num + 1
+
+                question = metaManager._csv_question(
+                    row, columns, file_hash, question_num,
+                    rankings.get(f"{question_num:03d}", 2), line, count_only
                 )
-                
-                questions.append(question_obj)
+                if question is None:
+                    continue
+
+                yield line if count_only else question
                 question_num += 1
+
+    @staticmethod
+    def _index_csv(file_path: Path, deck: "lazyDeck") -> Iterator[Tuple[int, int, int]]:
+        """
+        Yield (line, start offset, end offset) of every valid question row in a CSV file.
+        The header columns are stored on the deck for materializing rows later.
+        """
+        with open(file_path, 'rb') as f:
+            records = metaManager._csv_records(f)
+            header = next(records, None)
+            if header is None:
+                return
+
+            deck.csv_columns = metaManager._csv_columns(header[1])
+            question_num = 1
+            for line, row, start, end in records:
+                if metaManager._csv_question(row, deck.csv_columns, "", question_num,
+                                      2, line, count_only=True):
+                    yield line, start, end
+                    question_num += 1
+
+    @staticmethod
+    def _csv_records(f) -> Iterator[Tuple[int, List[str], int, int]]:
+        """
+        Split a binary CSV file into records, yielding (line, cells, start offset, end offset).
+        csv.reader itself finds where records end, so quotes inside unquoted cells are
+        read the same way as by _iter_csv. It pulls one line at a time and never reads
+        ahead, so the bytes read so far always end at the current record.
+        """
+        end = 0
+
+        def lines():
+            nonlocal end
+            for raw in f:
+                end += len(raw)
+                yield raw.decode('utf-8')
+
+        reader = csv.reader(lines())
+        start = 0
+        first_line = 1
+        for row in reader:
+            yield first_line, row, start, end
+            start = end
+            first_line = reader.line_num + 1
+
+    @staticmethod
+    def _csv_row(text: str) -> List[str]:
+        """Parse the cells of a single CSV record"""
+        return next(csv.reader(io.StringIO(text, newline='')), [])
+
+    @staticmethod
+    def _csv_columns(header: List[str]) -> Tuple:
+        """
+        Find the column indexes in a CSV header.
+        Returns (question, correct, source, [(answer number, column), ...])
+        """
+        columns = {name.strip(): i for i, name in enumerate(header)}
+
+        # (answer number, column index) for every answerN column, in answer order
+        answer_cols = sorted(
+            (int(match.group(1)), i)
+            for name, i in columns.items()
+            if (match := CSV_ANSWER_COLUMN.fullmatch(name))
+        )
+        return columns.get('question'), columns.get('correct'), columns.get('source'), answer_cols
+
+    @staticmethod
+    def _csv_question(row: List[str], columns: Tuple, file_hash: str, question_num: int,
+                      rank: int, line: int, count_only: bool = False):
+        """
+        Build the question for one CSV row.
+        Returns None for rows that are skipped, and True instead of a question with count_only.
+        """
+        question_col, correct_col, source_col, answer_cols = columns
+
+        def cell(col):
+            return row[col] if col is not None and col < len(row) else ''
+
+        # Skip empty rows
+        question_text = cell(question_col)
+        if not question_text.strip():
+            return None
         
-        return questions
+        # Parse correct answer(s)
+        correct_str = cell(correct_col).strip()
+        
+        if not correct_str:
+            if not count_only:
+                print(f"Warning: Question {question_num} has no correct answer specified")
+            return None
+        
+        # Multiple correct answers: "1,3,4", single correct answer: "2"
+        try:
+            correct_nums = {int(x.strip()) for x in correct_str.split(',')}
+        except ValueError:
+            if not count_only:
+                print(f"Warning: Invalid correct format in question {question_num}: {correct_str}")
+            return None
+        question_type = "multiple_choice" if ',' in correct_str else "single_choice"
+        
+        # Build answer list from the answerN columns, only non-empty answers
+        answers = []
+        for number, col in answer_cols:
+            answer_text = cell(col).strip()
+            if answer_text:
+                answers.append({
+                    'text': answer_text,
+                    'is_correct': number in correct_nums
+                })
+        
+        # Validate we have at least 2 answers
+        if len(answers) < 2:
+            if not count_only:
+                print(f"Warning: Question {question_num} has fewer than 2 answers")
+            return None
+        
+        if count_only:
+            return True
 
-    def _parse_question_count(self, file: Path) -> int:
+        return metaQuestion(
+            id=f"{file_hash}-{question_num:03d}",
+            hash=file_hash,
+            question_number=question_num,
+            text=question_text,
+            source=cell(source_col),
+            rank=rank,
+            answers=answers,
+            question_type=question_type,
+            instruction="",  # CSV format doesn't have explicit instructions
+            line=line
+        )
+
+    def _index_questions_lazily(self, file_obj: metaFile) -> "lazyDeck":
+        """Build the offset index of a deck without keeping its questions in memory"""
+        meta_path = file_obj.filepath.with_suffix('.meta.json')
+        rankings = self._load_or_create_meta(file_obj.filepath, meta_path, file_obj.hash)['rankings']
+        return lazyDeck(self, file_obj, rankings)
+
+    def _materialize(self, deck: "lazyDeck", chunk: bytes, start: int, question_number: int) -> metaQuestion:
+        """Parse a single question out of its byte range in the source file"""
+        file_hash = deck.file_obj.hash
+        if deck.csv_columns is not None:
+            row = self._csv_row(chunk.decode('utf-8'))
+            return self._csv_question(row, deck.csv_columns, file_hash, question_number, 2, 0)
+
+        lines = self._byte_lines(io.BytesIO(chunk), start)
+        return next(self._iter_markdown_lines(lines, file_hash, {}, first_number=question_number))
+
+    @staticmethod
+    def _parse_question_count(file: Path) -> int:
         """
         Count questions in file without full parsing.
         
@@ -541,22 +2236,12 @@ class metaManager:
         Returns:
             Number of questions in the file
         """
-        with open(file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
+        # Same validation as the parsers, so question numbers line up with the rankings
         if file.suffix == '.md':
-            # Each question has exactly 2 separators: one for the question block, one for the answer block
-            import re
-            separators = re.findall(r'\|\s*-+\s*\|', content)
-            # Number of questions = total separators / 2
-            count = len(separators) // 2
-            return count
+            return sum(1 for _ in metaManager._iter_markdown(file, "", {}, count_only=True))
         
         elif file.suffix == '.csv':
-            # Count non-header, non-empty lines
-            lines = [line.strip() for line in content.strip().split('\n') if line.strip()]
-            # Subtract 1 for header row
-            return max(0, len(lines) - 1)
+            return sum(1 for _ in metaManager._iter_csv(file, "", {}, count_only=True))
         
         return 0
     
@@ -574,18 +2259,26 @@ class metaManager:
         return [file_obj for file_obj in self.available.values()]
 
     def delete_metadata(self, filename: str):
-        file_hash = None
-        for hash_val, file_obj in self.available.items():
-            if file_obj.filename == filename:
-                file_hash = hash_val
-            
-        if not file_hash:
+        file_obj = self.get_file(filename)
+        if file_obj is None:
             raise ValueError(f"File {filename} not found")
         
+        file_hash = file_obj.hash
         meta_path = self._get_meta(file_hash)
 
-        if meta_path.exists():
-            meta_path.unlink()
+        with self._lock:
+            self._meta_cache.pop(meta_path, None)
+            self._dirty.discard(meta_path)
+            self._journaled.discard(meta_path)
+            self.store.delete(meta_path)
+            self.rank_histograms.pop(file_hash, None)
+            self._histograms_changed = True
+
+        # Make the next scan pick the file up again
+        manifest = self._load_manifest()
+        if manifest.pop(filename, None) is not None:
+            self._save_manifest()
         
         if file_hash in self.loaded:
-            del self.loaded[file_hash]
\ No newline at end of file
+            self._unload_deck(file_hash)
+            self._rebuild_scheduler()
@@ -0,0 +1,162 @@
+"""
+Question numbers are what the rankings are keyed by, so the markdown parser must
+keep numbering the bundled decks exactly as it does now. The pinned values were
+checked against the original whole-file parser. The question count, the lazy index
+and the compiled deck cache must agree with the parser too.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import pytest
+
+from variables import metaFile, metaManager
+
+QUESTIONS_DIR = Path(__file__).resolve().parent.parent / "logic" / "questions"
+
+# Per question: (number, line, type, number of answers, indices of the correct answers, source)
+BUNDLED = {
+    "test-questions.md": [
+        (1, 4, "single_choice", 4, [3], "Anton Schindler"),
+        (2, 14, "single_choice", 4, [0], "EY ifb BW-Experten"),
+        (3, 24, "multiple_choice", 5, [1, 3, 4], "EY ifb BW-Experten"),
+        (4, 35, "single_choice", 4, [1], "EY ifb BW-Experten"),
+        (5, 45, "single_choice", 4, [0], "EY ifb BW-Experten"),
+        (6, 55, "single_choice", 4, [0], "EY ifb BW-Experten"),
+        (7, 65, "single_choice", 4, [3], "EY ifb BW-Experten"),
+    ],
+    "test-questions2.md": [
+        (1, 3, "multiple_choice", 4, [0, 1], "EY ifb BW-Experten"),
+        (2, 13, "single_choice", 4, [2], "EY ifb BW-Experten"),
+        (3, 23, "multiple_choice", 5, [0, 1, 3], "EY ifb BW-Experten"),
+        (4, 34, "multiple_choice", 4, [0, 2], "EY ifb BW-Experten"),
+        (5, 44, "multiple_choice", 5, [1, 2, 4], "EY ifb BW-Experten"),
+        (6, 55, "multiple_choice", 4, [1, 3], "EY ifb BW-Experten"),
+        (7, 65, "multiple_choice", 5, [1, 3, 4], "EY ifb BW-Experten"),
+        (8, 76, "single_choice", 4, [], "Research"),
+        (9, 86, "single_choice", 4, [2], "Anton Schindler"),
+        (10, 96, "multiple_choice", 4, [0, 2], "EY ifb BW-Experten"),
+        (11, 106, "multiple_choice", 5, [], "research"),
+        (12, 117, "single_choice", 4, [3], "EY ifb BW-Experten"),
+        (13, 127, "single_choice", 4, [3], "EY ifb BW-Experten"),
+        (14, 137, "multiple_choice", 5, [0], "research"),
+        (15, 149, "single_choice", 4, [0], "EY ifb BW-Experten"),
+        (16, 159, "multiple_choice", 4, [2, 3], "EY ifb BW-Experten"),
+    ],
+}
+
+# sha256 of every question's number, text, instruction, type, answers and source (see fingerprint)
+FINGERPRINTS = {
+    "test-questions.md": "2b0c73e20c2723c4ac7fcffbc086b9edf9257747b45ce6a0890e98fd4bf6715c",
+    "test-questions2.md": "a42a5d713587b92b24f948635f1623867a33a57bc02045e7ad88641819434151",
+}
+
+# A header, separators with and without padding, a block without answers, one with only
+# an instruction, a separator in the middle of a line, and a last block closed by the end of the file
+EDGE_CASES = """Header text, not a question
+| --- |
+First question?
+| | Please choose the correct answer. |
+|-------|
+| | Yes | True |
+| | No | False |
+Source: Someone
+| ------- |
+Block without answers
+| ------- |
+Source: nobody
+| ------- |
+| | There are 2 correct answers to this question. |
+| ------- |
+| | Orphan answer | True |
+| ------- |
+Second question?
+There are 2 correct answers to this question.
+|   -   |
+| | A | true |
+| | B | TRUE |
+| | malformed answer line |
+| | C | no |
+| ------- | Third question? | ------- | | | Inline | True |
+| ------- |
+Last question without a closing separator
+| ------- |
+| | Only | False |
+"""
+
+def fingerprint(questions) -> str:
+    data = [
+        [q.question_number, q.text, q.instruction, q.question_type, q.answers, q.source]
+        for q in questions
+    ]
+    return hashlib.sha256(json.dumps(data).encode()).hexdigest()
+
+@pytest.mark.parametrize("filename", sorted(BUNDLED))
+def test_bundled_decks_parse_as_pinned(filename):
+    questions = metaManager._parse_markdown(QUESTIONS_DIR / filename, "abcd1234", {})
+
+    summary = [
+        (q.question_number, q.line, q.question_type, len(q.answers),
+         [i for i, answer in enumerate(q.answers) if answer['is_correct']], q.source)
+        for q in questions
+    ]
+    assert summary == BUNDLED[filename]
+    assert fingerprint(questions) == FINGERPRINTS[filename]
+    assert [q.id for q in questions] == [f"abcd1234-{i:03d}" for i in range(1, len(questions) + 1)]
+
+@pytest.mark.parametrize("filename", sorted(BUNDLED))
+def test_counts_index_and_cache_agree_with_parser(filename, tmp_path):
+    path = QUESTIONS_DIR / filename
+    questions = metaManager._parse_markdown(path, "abcd1234", {})
+
+    assert metaManager._parse_question_count(path) == len(BUNDLED[filename])
+    assert [line for line, _, _ in metaManager._index_markdown(path)] == [q.line for q in questions]
+
+    file_obj = metaFile(filepath=path, hash="abcd1234", filename=filename,
+                        total_questions=len(questions), last_updated="")
+    cache_path = tmp_path / "deck.cache"
+    metaManager._save_deck_cache(cache_path, file_obj, questions)
+    cached = metaManager._load_deck_cache(cache_path, file_obj, {})
+    assert cached is not None
+    assert fingerprint(cached) == FINGERPRINTS[filename]
+
+def test_rankings_follow_question_numbers():
+    path = QUESTIONS_DIR / "test-questions2.md"
+    questions = metaManager._parse_markdown(path, "abcd1234", {"003": 5, "016": 1})
+    assert [q.rank for q in questions] == [2, 2, 5] + [2] * 12 + [1]
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_separator_and_invalid_block_edge_cases(newline, tmp_path, capsys):
+    path = tmp_path / "edge.md"
+    path.write_bytes(EDGE_CASES.replace("\n", newline).encode("utf-8"))
+
+    questions = metaManager._parse_markdown(path, "abcd1234", {"002": 5})
+
+    # Skipped blocks do not use up a question number
+    assert [(q.question_number, q.text) for q in questions] == [
+        (1, "First question?"),
+        (2, "Second question?"),
+        (3, "Third question?"),
+        (4, "Last question without a closing separator"),
+    ]
+    first, second, third, last = questions
+    assert first.question_type == "single_choice"
+    assert first.instruction == "Please choose the correct answer."
+    assert first.source == "Someone"
+    assert first.answers == [{'text': "Yes", 'is_correct': True}, {'text': "No", 'is_correct': False}]
+
+    assert second.question_type == "multiple_choice"
+    assert second.rank == 5
+    # Any case of true counts, an answer line without a second column is a wrong answer
+    assert second.answers == [
+        {'text': "A", 'is_correct': True},
+        {'text': "B", 'is_correct': True},
+        {'text': "malformed answer line", 'is_correct': False},
+        {'text': "C", 'is_correct': False},
+    ]
+    assert third.answers == [{'text': "Inline", 'is_correct': True}]
+    assert last.answers == [{'text': "Only", 'is_correct': False}]
+
+    assert capsys.readouterr().out.count("Skipped invalid question block") == 2
+    assert metaManager._parse_question_count(path) == 4
+    assert len(list(metaManager._index_markdown(path))) == 4
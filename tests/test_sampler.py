@@ -0,0 +1,83 @@
+"""
+The Fenwick tree sampler must draw every question with probability proportional
+to rank_weights[rank], after building, updates and decks added later alike.
+Draws use a seeded generator, so the chi-square checks are deterministic.
+"""
+import random
+from collections import Counter
+
+from variables import rank_weights, weightedSampler
+
+DRAWS = 200_000
+
+# Upper 0.1% points of the chi-square distribution by degrees of freedom
+CHI_SQUARE_CRITICAL = {9: 27.877, 14: 36.123, 19: 43.820}
+
+def chi_square(sampler: weightedSampler, expected_ranks: dict, seed: int) -> float:
+    """Chi-square statistic of DRAWS draws against the weights of expected_ranks ((hash, number) -> rank)"""
+    rng = random.Random(seed)
+    counts = Counter(sampler.draw(rng) for _ in range(DRAWS))
+    assert set(counts) <= set(expected_ranks)
+
+    total_weight = sum(rank_weights[rank] for rank in expected_ranks.values())
+    statistic = 0.0
+    for key, rank in expected_ranks.items():
+        expected = DRAWS * rank_weights[rank] / total_weight
+        statistic += (counts[key] - expected) ** 2 / expected
+    return statistic
+
+def deck_ranks(decks: dict) -> dict:
+    return {
+        (file_hash, number): rank
+        for file_hash, ranks in decks.items()
+        for number, rank in enumerate(ranks, start=1)
+    }
+
+def test_draws_follow_rank_weights():
+    decks = {"aaaa": [1, 2, 3, 4, 5], "bbbb": [5, 4, 3, 2, 1]}
+    sampler = weightedSampler()
+    sampler.build(decks)
+
+    assert len(sampler) == 10
+    assert sampler.total == 2 * sum(rank_weights.values())
+    assert chi_square(sampler, deck_ranks(decks), seed=1) < CHI_SQUARE_CRITICAL[9]
+
+def test_draws_follow_updates_and_added_decks():
+    decks = {"aaaa": [2] * 5, "bbbb": [1, 2, 3, 4, 5]}
+    sampler = weightedSampler()
+    sampler.build(decks)
+
+    for number, rank in [(1, 5), (3, 1), (5, 4)]:
+        sampler.update("aaaa", number, rank)
+        decks["aaaa"][number - 1] = rank
+    sampler.update("cccc", 1, 5)  # unknown decks are ignored
+    sampler.update("aaaa", 99, 5)  # and so are unknown questions
+
+    decks["cccc"] = [3, 3, 1, 5, 2]
+    sampler.add_deck("cccc", decks["cccc"])
+
+    assert sampler.total == sum(rank_weights[rank] for ranks in decks.values() for rank in ranks)
+    assert chi_square(sampler, deck_ranks(decks), seed=2) < CHI_SQUARE_CRITICAL[14]
+
+def test_tree_matches_weights_after_random_changes():
+    rng = random.Random(3)
+    sampler = weightedSampler()
+    decks = {f"{i:04d}": [rng.randint(1, 5) for _ in range(rng.randint(1, 40))] for i in range(6)}
+    sampler.build(decks)
+    sampler.add_deck("late", [rng.randint(1, 5) for _ in range(17)])
+
+    for _ in range(500):
+        file_hash = rng.choice(sampler.decks)
+        size = sampler.bases[file_hash][1]
+        sampler.update(file_hash, rng.randint(1, size), rng.randint(1, 5))
+
+    # Node i of a Fenwick tree holds the weights of positions (i - lowbit(i), i]
+    weights = sampler.weights
+    for i in range(1, len(weights) + 1):
+        assert sampler.tree[i] == sum(weights[i - (i & -i):i])
+    assert sampler.total == sum(weights)
+
+def test_empty_sampler_draws_nothing():
+    sampler = weightedSampler()
+    sampler.build({})
+    assert sampler.draw() is None